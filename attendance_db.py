@@ -0,0 +1,340 @@
+import argparse
+import csv
+import math
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+DB_PATH = "attendance.db"
+STUDENTS_CSV = os.path.join("StudentDetails", "StudentDetails.csv")
+ATTENDANCE_DIR = "Attendance"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attendance (
+    session TEXT NOT NULL,
+    student_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    UNIQUE (session, student_id)
+);
+CREATE INDEX IF NOT EXISTS attendance_student ON attendance (student_id, date);
+CREATE INDEX IF NOT EXISTS attendance_date ON attendance (date, student_id);
+CREATE TABLE IF NOT EXISTS training_status (
+    student_id INTEGER PRIMARY KEY,
+    images INTEGER NOT NULL,
+    last_capture REAL
+);
+CREATE TABLE IF NOT EXISTS trained_status (
+    student_id INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    trained_images INTEGER NOT NULL,
+    scanned_at REAL NOT NULL,
+    PRIMARY KEY (student_id, engine)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS model_status (
+    engine TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    trained_at REAL NOT NULL,
+    students INTEGER NOT NULL,
+    images INTEGER NOT NULL
+);
+"""
+
+def connect(path=DB_PATH):
+    """Open the store, creating its tables on first use"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def session_name(csv_path):
+    """Attendance session name of a CSV, e.g. Attendance_2024-01-31_09-00-00"""
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+def load_students(path=DB_PATH):
+    """All students as an ID to name dict"""
+    with closing(connect(path)) as conn:
+        return dict(conn.execute("SELECT id, name FROM students"))
+
+def save_student(student_id, name, path=DB_PATH):
+    """Add a student or rename an existing one; returns the previous name, if any"""
+    with closing(connect(path)) as conn, conn:
+        row = conn.execute("SELECT name FROM students WHERE id = ?", (student_id,)).fetchone()
+        conn.execute(
+            "INSERT INTO students (id, name) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET name = excluded.name",
+            (student_id, name),
+        )
+        return row[0] if row else None
+
+def save_session(csv_path, rows, path=DB_PATH):
+    """Store the (Id, Name, Date, Time) rows of one session; rows already stored are skipped"""
+    session = session_name(csv_path)
+    with closing(connect(path)) as conn, conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO attendance (session, student_id, name, date, time) VALUES (?, ?, ?, ?, ?)",
+            ((session, int(student_id), name, date, time_str) for student_id, name, date, time_str in rows),
+        )
+
+def read_csv_rows(csv_path):
+    """Rows of a CSV with an Id column, without the header"""
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or header[0] != 'Id':
+            return []
+        return [row for row in reader if row]
+
+def parse_student_row(row):
+    """(student_id, name) of a StudentDetails.csv row, or None if its ID is not a whole number
+    
+    IDs like "12.0" are read as 12.
+    """
+    try:
+        student_id = float(row[0])
+        name = row[1].strip()
+    except (IndexError, ValueError):
+        return None
+    if not math.isfinite(student_id) or student_id != int(student_id) or not name:
+        return None
+    return int(student_id), name
+
+def import_csvs(students_csv=STUDENTS_CSV, attendance_dir=ATTENDANCE_DIR, path=DB_PATH):
+    """Import StudentDetails.csv and every attendance CSV; safe to run repeatedly
+    
+    Returns the number of students and attendance sessions read.
+    """
+    student_count = session_count = 0
+    
+    if os.path.exists(students_csv):
+        students = []
+        for row in read_csv_rows(students_csv):
+            student = parse_student_row(row)
+            if student is None:
+                print(f"⚠️ Warning: Skipping student row {row} with an invalid ID or name")
+                continue
+            students.append(student)
+        with closing(connect(path)) as conn, conn:
+            # Keep the first name of a repeated ID, as the CSV lookup did
+            conn.executemany("INSERT OR IGNORE INTO students (id, name) VALUES (?, ?)", students)
+        student_count = len(students)
+    
+    if os.path.exists(attendance_dir):
+        for entry in sorted(os.scandir(attendance_dir), key=lambda entry: entry.name):
+            if not (entry.name.startswith("Attendance_") and entry.name.endswith(".csv")):
+                continue
+            try:
+                save_session(entry.path, read_csv_rows(entry.path), path)
+                session_count += 1
+            except Exception as e:
+                print(f"⚠️ Warning: Could not import {entry.path}: {e}")
+    
+    return student_count, session_count
+
+def import_if_empty(path=DB_PATH):
+    """Import the CSV records once into a database that has never imported them; returns whether it did
+    
+    The import is recorded in the meta table, so a CSV without any students
+    is not read again on every call.
+    """
+    with closing(connect(path)) as conn, conn:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+            return False
+        # Databases filled before the import was recorded already hold the students
+        if conn.execute("SELECT 1 FROM students LIMIT 1").fetchone():
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', ?)", (str(time.time()),))
+            return False
+    if not os.path.exists(STUDENTS_CSV):
+        return False
+    
+    print("🔄 Importing existing CSV records into the database...")
+    import_csvs(path=path)
+    with closing(connect(path)) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_imported', ?)", (str(time.time()),))
+    return True
+
+def record_capture(student_id, new_images, captured_at=None, path=DB_PATH):
+    """Count newly written training images of a student; they are pending until the next training"""
+    captured_at = captured_at or time.time()
+    with closing(connect(path)) as conn, conn:
+        conn.execute(
+            "INSERT INTO training_status (student_id, images, last_capture) VALUES (?, ?, ?) "
+            "ON CONFLICT (student_id) DO UPDATE SET images = images + excluded.images, "
+            "last_capture = MAX(COALESCE(last_capture, 0), excluded.last_capture)",
+            (student_id, new_images, captured_at),
+        )
+
+def record_training(students, engine="lbph", started_at=None, path=DB_PATH):
+    """Record which images one engine's model was just trained on
+    
+    `students` maps student IDs to the {filename: mtime} the model was
+    trained on, as scanned at started_at. Only this engine's trained state
+    is replaced; capture counts are kept, and students captured after the
+    scan stay pending.
+    """
+    trained_at = time.time()
+    started_at = started_at or trained_at
+    with closing(connect(path)) as conn, conn:
+        # Images added by hand never went through record_capture
+        conn.executemany(
+            "INSERT OR IGNORE INTO training_status (student_id, images, last_capture) VALUES (?, ?, ?)",
+            ((student_id, len(files), max(files.values(), default=None)) for student_id, files in students.items()),
+        )
+        conn.execute("DELETE FROM trained_status WHERE engine = ?", (engine,))
+        conn.executemany(
+            "INSERT INTO trained_status (student_id, engine, trained_images, scanned_at) VALUES (?, ?, ?, ?)",
+            ((student_id, engine, len(files), started_at) for student_id, files in students.items()),
+        )
+        conn.execute(
+            "INSERT INTO model_status (engine, version, trained_at, students, images) VALUES (?, 1, ?, ?, ?) "
+            "ON CONFLICT (engine) DO UPDATE SET version = version + 1, trained_at = excluded.trained_at, "
+            "students = excluded.students, images = excluded.images",
+            (engine, trained_at, len(students), sum(len(files) for files in students.values())),
+        )
+
+def record_removal(student_id, path=DB_PATH):
+    """Drop a student whose model entry and training images were removed from the training status"""
+    with closing(connect(path)) as conn, conn:
+        conn.execute("DELETE FROM training_status WHERE student_id = ?", (student_id,))
+        conn.execute("DELETE FROM trained_status WHERE student_id = ?", (student_id,))
+
+def status_indexed(path=DB_PATH):
+    """Whether the training status was ever filled from a scan of TrainingImage"""
+    with closing(connect(path)) as conn:
+        return conn.execute("SELECT 1 FROM meta WHERE key = 'status_indexed'").fetchone() is not None
+
+def import_training_status(students, trained, trained_at=None, engine="lbph", path=DB_PATH):
+    """Fill the training status from a scan of the images and one engine's training manifest, once
+    
+    `students` and `trained` map student IDs to {filename: mtime} on disk
+    and in the model. The scan replaces the image counts of captures
+    recorded before it, and the import is recorded in the meta table.
+    """
+    with closing(connect(path)) as conn, conn:
+        conn.executemany(
+            "INSERT INTO training_status (student_id, images, last_capture) VALUES (?, ?, ?) "
+            "ON CONFLICT (student_id) DO UPDATE SET images = excluded.images, "
+            "last_capture = MAX(COALESCE(last_capture, 0), excluded.last_capture)",
+            ((student_id, len(files), max(files.values(), default=None)) for student_id, files in students.items()),
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('status_indexed', ?)", (str(time.time()),))
+        # A student whose images changed since training counts as scanned before any capture
+        conn.executemany(
+            "INSERT OR IGNORE INTO trained_status (student_id, engine, trained_images, scanned_at) VALUES (?, ?, ?, ?)",
+            (
+                (student_id, engine, len(files), (trained_at or 0.0) if students.get(student_id) == files else 0.0)
+                for student_id, files in trained.items() if student_id in students
+            ),
+        )
+
+# Students with images that the engine's model has not seen: never trained, or captured since
+PENDING_QUERY = (
+    "FROM training_status s LEFT JOIN trained_status t ON t.student_id = s.student_id AND t.engine = ? "
+    "WHERE t.student_id IS NULL OR s.last_capture > t.scanned_at"
+)
+
+def training_summary(pending_limit=100, engine="lbph", path=DB_PATH):
+    """Image counts and one engine's training state from the status tables, without touching TrainingImage"""
+    with closing(connect(path)) as conn:
+        students, images, last_capture = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(images), 0), MAX(last_capture) FROM training_status"
+        ).fetchone()
+        trained = conn.execute(
+            "SELECT COUNT(*) FROM trained_status t JOIN training_status s ON s.student_id = t.student_id "
+            "WHERE t.engine = ?", (engine,)
+        ).fetchone()[0]
+        pending_count = conn.execute("SELECT COUNT(*) " + PENDING_QUERY, (engine,)).fetchone()[0]
+        pending = [
+            student_id for (student_id,) in
+            conn.execute("SELECT s.student_id " + PENDING_QUERY + " ORDER BY s.student_id LIMIT ?",
+                         (engine, pending_limit))
+        ]
+        registered = conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        models = {
+            model_engine: {"version": version, "trained_at": trained_at, "students": model_students,
+                           "images": model_images}
+            for model_engine, version, trained_at, model_students, model_images in
+            conn.execute("SELECT engine, version, trained_at, students, images FROM model_status ORDER BY engine")
+        }
+        for model_engine, model in models.items():
+            model["pending_students"] = conn.execute("SELECT COUNT(*) " + PENDING_QUERY,
+                                                     (model_engine,)).fetchone()[0]
+    
+    return {
+        "registered_students": registered,
+        "students_with_images": students,
+        "images": images,
+        "last_capture": last_capture,
+        "engine": engine,
+        "trained_students": trained,
+        "pending_students": pending_count,
+        "pending_ids": pending,
+        "models": models,
+    }
+
+def student_rollup(student_id=None, path=DB_PATH):
+    """Days attended and first and last attendance date per student"""
+    query = (
+        "SELECT student_id, MAX(name), COUNT(DISTINCT date), MIN(date), MAX(date) "
+        "FROM attendance {where} GROUP BY student_id ORDER BY student_id"
+    )
+    with closing(connect(path)) as conn:
+        if student_id is None:
+            rows = conn.execute(query.format(where=""))
+        else:
+            rows = conn.execute(query.format(where="WHERE student_id = ?"), (student_id,))
+        return [
+            {"Id": sid, "Name": name, "Days": days, "First": first, "Last": last}
+            for sid, name, days, first, last in rows
+        ]
+
+def day_rollup(start_date=None, end_date=None, path=DB_PATH):
+    """Number of students present and sessions held per date"""
+    with closing(connect(path)) as conn:
+        rows = conn.execute(
+            "SELECT date, COUNT(DISTINCT student_id), COUNT(DISTINCT session) FROM attendance "
+            "WHERE date >= ? AND date <= ? GROUP BY date ORDER BY date",
+            (start_date or "", end_date or "9999-99-99"),
+        )
+        return [{"Date": date, "Present": present, "Sessions": sessions} for date, present, sessions in rows]
+
+def student_days(student_id, path=DB_PATH):
+    """Dates a student attended, oldest first"""
+    with closing(connect(path)) as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT date FROM attendance WHERE student_id = ? ORDER BY date", (student_id,)
+        )
+        return [date for (date,) in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student and attendance store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("import", help="import StudentDetails.csv and the attendance CSVs")
+    students_parser = subparsers.add_parser("students", help="days attended per student")
+    students_parser.add_argument("--id", type=int, help="only this student")
+    days_parser = subparsers.add_parser("days", help="students present per day")
+    days_parser.add_argument("--start", help="first date (YYYY-MM-DD)")
+    days_parser.add_argument("--end", help="last date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    if args.command == "import":
+        student_count, session_count = import_csvs()
+        print(f"✅ Imported {student_count} students and {session_count} attendance sessions into {DB_PATH}")
+    elif args.command == "students":
+        for row in student_rollup(args.id):
+            print(f"ID: {row['Id']} | Name: {row['Name']} | Days: {row['Days']} | {row['First']} to {row['Last']}")
+    else:
+        for row in day_rollup(args.start, args.end):
+            print(f"{row['Date']}: {row['Present']} present in {row['Sessions']} sessions")
+    print(f"⏱️ {1000 * (time.perf_counter() - start):.1f} ms")
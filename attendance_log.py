@@ -0,0 +1,215 @@
+import csv
+import datetime
+import os
+import queue
+import threading
+import time
+from attendance_db import save_session
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+ATTENDANCE_DIR = "Attendance"
+ATTENDANCE_COLUMNS = ['Id', 'Name', 'Date', 'Time']
+WAL_SUFFIX = ".wal"
+OPEN_ATTEMPTS = 100
+
+def session_csv_path(directory=ATTENDANCE_DIR, timestamp=None):
+    """Attendance CSV path of a session started at timestamp"""
+    timestamp = timestamp or datetime.datetime.now()
+    date_str = timestamp.strftime('%Y-%m-%d')
+    time_str = timestamp.strftime('%H-%M-%S')
+    return os.path.join(directory, f"Attendance_{date_str}_{time_str}.csv")
+
+def write_csv_atomic(rows, path):
+    """Write attendance rows to path so readers never see a half-written file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTENDANCE_COLUMNS)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def lock_file(f):
+    """Take an exclusive lock on an open file without waiting; returns whether it was taken
+    
+    The lock is held until the file is closed, including when the process
+    dies, so a log that cannot be locked belongs to a running session.
+    """
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def read_wal(path):
+    """Read the complete rows of a log, first row per student ID"""
+    rows = []
+    seen = set()
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            # A crash can leave the last line cut short
+            if len(row) != len(ATTENDANCE_COLUMNS) or row[0] in seen:
+                continue
+            seen.add(row[0])
+            rows.append(row)
+    return rows
+
+def recover_sessions(directory=ATTENDANCE_DIR):
+    """Compact the logs of interrupted sessions into their attendance CSVs
+    
+    Logs still locked by a running session are left alone.
+    """
+    recovered = []
+    if not os.path.exists(directory):
+        return recovered
+    
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(WAL_SUFFIX):
+            continue
+        try:
+            with open(entry.path, 'a+', newline='') as f:
+                if not lock_file(f):
+                    continue
+                rows = read_wal(entry.path)
+                csv_path = entry.path[:-len(WAL_SUFFIX)]
+                if rows:
+                    write_csv_atomic(rows, csv_path)
+                    save_session(csv_path, rows)
+                    print(f"♻️ Recovered {len(rows)} records from an interrupted session: {csv_path}")
+                    recovered.append(csv_path)
+                os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            print(f"⚠️ Warning: Could not recover {entry.path}: {e}")
+    
+    return recovered
+
+class AttendanceLog:
+    """Write-ahead log of a session's attendance, written by a background thread
+    
+    Records are appended to Attendance_<date>_<time>.csv.wal as they arrive
+    and fsynced every fsync_batch records or fsync_interval seconds. Every
+    compact_interval seconds the log is also rewritten as the session's CSV.
+    append() never blocks; if the queue is full the record only misses the
+    log and still reaches the CSV written by close(). The log is locked for
+    the session's lifetime; a log left behind by a crash is unlocked and is
+    turned into its CSV by the next start().
+    """
+    
+    def __init__(self, directory=ATTENDANCE_DIR, queue_size=256, fsync_batch=16,
+                 fsync_interval=1.0, compact_interval=60.0):
+        self.directory = directory
+        self.csv_path = session_csv_path(directory)
+        self.wal_path = self.csv_path + WAL_SUFFIX
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_interval = compact_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.rows = []
+        self.dropped = 0
+        self.thread = None
+        self.wal = None
+    
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.wal = self._open_locked()
+        recover_sessions(self.directory)
+        self.thread = threading.Thread(target=self._run, name="attendance-log", daemon=True)
+        self.thread.start()
+    
+    def append(self, row):
+        """Queue one (Id, Name, Date, Time) record for the log"""
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _open_locked(self):
+        """Open and lock a log no other session uses, making sure the locked file is still the one on disk
+        
+        Sessions started in the same second get a _2, _3, ... suffix.
+        """
+        base = self.csv_path[:-len(".csv")]
+        for attempt in range(OPEN_ATTEMPTS):
+            if attempt:
+                self.csv_path = f"{base}_{attempt + 1}.csv"
+                self.wal_path = self.csv_path + WAL_SUFFIX
+            if os.path.exists(self.csv_path) or os.path.exists(self.wal_path):
+                continue
+            
+            f = open(self.wal_path, 'a', newline='')
+            # Another session may have created the same file, or its recovery
+            # may have locked and removed ours first
+            if lock_file(f) and os.path.exists(self.wal_path) and \
+                    os.path.samestat(os.fstat(f.fileno()), os.stat(self.wal_path)):
+                return f
+            f.close()
+        raise RuntimeError(f"Could not create a session log next to {base}.csv")
+    
+    def _run(self):
+        f = self.wal
+        writer = csv.writer(f)
+        unsynced = 0
+        last_sync = last_compact = time.monotonic()
+        
+        while True:
+            try:
+                row = self.queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                row = False
+            
+            if row is None:
+                break
+            if row:
+                writer.writerow(row)
+                self.rows.append(row)
+                unsynced += 1
+            
+            now = time.monotonic()
+            if unsynced and (unsynced >= self.fsync_batch or now - last_sync >= self.fsync_interval):
+                f.flush()
+                os.fsync(f.fileno())
+                unsynced = 0
+                last_sync = now
+            
+            if self.rows and now - last_compact >= self.compact_interval:
+                write_csv_atomic(self.rows, self.csv_path)
+                last_compact = now
+        
+        f.flush()
+        os.fsync(f.fileno())
+    
+    def close(self, rows=None):
+        """Flush the log, write the final CSV and remove the log
+        
+        rows, when given, is the complete session and also covers records
+        dropped from a full queue. Returns the CSV path, or None if nothing
+        was recorded. Closing an already closed log does nothing.
+        """
+        if self.wal is None:
+            return None
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        
+        rows = self.rows if rows is None else rows
+        if self.dropped:
+            print(f"⚠️ Warning: {self.dropped} attendance records were not logged while the writer was busy")
+        
+        if rows:
+            write_csv_atomic(rows, self.csv_path)
+        # Removed while still locked so no other session recovers it meanwhile
+        if os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self.wal.close()
+        self.wal = None
+        return self.csv_path if rows else None
@@ -0,0 +1,208 @@
+import queue
+import threading
+import time
+import cv2
+from perf_metrics import StageStats
+
+DROP_POLICIES = ("oldest", "newest", "block")
+
+class PipelineConfig:
+    """Queue depths, worker count and frame-drop policy of the attendance pipeline
+    
+    drop_policy decides what happens when a stage's input queue is full:
+    "oldest" discards the oldest queued frame, "newest" discards the frame
+    being added and "block" waits, which slows the upstream stage down.
+    The grabber always keeps only the latest camera frame.
+    """
+    
+    def __init__(self, recognition_workers=2, detection_queue=2, result_queue=2, drop_policy="oldest"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}")
+        self.recognition_workers = recognition_workers
+        self.detection_queue = detection_queue
+        self.result_queue = result_queue
+        self.drop_policy = drop_policy
+
+class FrameResult:
+    """A frame travelling through the pipeline"""
+    
+    def __init__(self, seq, captured_at, frame):
+        self.seq = seq
+        self.captured_at = captured_at
+        self.frame = frame
+        self.gray = None
+        self.faces = ()
+        self.tracks = None
+        self.predictions = []
+
+class LatestFrame:
+    """Single-slot buffer that only ever holds the most recent camera frame"""
+    
+    def __init__(self):
+        self.item = None
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def put(self, item):
+        with self.condition:
+            self.item = item
+            self.condition.notify()
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+    
+    def take(self, timeout=0.1):
+        """Remove and return the latest item, or None if there is none yet"""
+        with self.condition:
+            if self.item is None and not self.closed:
+                self.condition.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+_END = object()
+
+class AttendancePipeline:
+    """Camera grabber, detection worker and recognition pool running in threads
+    
+    The caller renders: it pulls finished frames with next_result() and
+    reports each rendered frame to its metrics. OpenCV windows must stay on
+    the main thread, which is why rendering is not a thread of its own.
+    The optional track callable runs in the detection thread, so it sees
+    frames in order; its result is passed on to recognize.
+    """
+    
+    def __init__(self, cam, detect, recognize, config=None, track=None):
+        self.cam = cam
+        self.detect = detect
+        self.recognize = recognize
+        self.track = track
+        self.config = config or PipelineConfig()
+        self.stats = StageStats()
+        self.latest = LatestFrame()
+        self.detected = queue.Queue(maxsize=self.config.detection_queue)
+        self.results = queue.Queue(maxsize=self.config.result_queue)
+        self.stopped = threading.Event()
+        self.threads = []
+        self.finished_workers = 0
+        self.last_seq = -1
+    
+    def start(self):
+        self.threads = [threading.Thread(target=self._grab, daemon=True),
+                        threading.Thread(target=self._detect, daemon=True)]
+        self.threads += [threading.Thread(target=self._recognize, daemon=True)
+                         for _ in range(self.config.recognition_workers)]
+        for thread in self.threads:
+            thread.start()
+    
+    def stop(self):
+        self.stopped.set()
+        self.latest.close()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+    
+    def _put(self, stage_queue, item, stage):
+        """Put an item on a bounded queue according to the drop policy"""
+        policy = self.config.drop_policy
+        while not self.stopped.is_set():
+            try:
+                if policy == "block" or item is _END:
+                    stage_queue.put(item, timeout=0.1)
+                else:
+                    stage_queue.put_nowait(item)
+                return
+            except queue.Full:
+                if item is _END:
+                    continue
+                if policy == "newest":
+                    self.stats.drop(stage)
+                    return
+                if policy == "oldest" and not self._drop_oldest(stage_queue, stage):
+                    # Only end markers are queued; wait for the consumer instead
+                    try:
+                        stage_queue.put(item, timeout=0.1)
+                        return
+                    except queue.Full:
+                        pass
+    
+    def _drop_oldest(self, stage_queue, stage):
+        """Discard the oldest queued frame, never an end marker; returns whether one was dropped"""
+        with stage_queue.mutex:
+            for i, queued in enumerate(stage_queue.queue):
+                if queued is not _END:
+                    del stage_queue.queue[i]
+                    stage_queue.not_full.notify()
+                    self.stats.drop(stage)
+                    return True
+        return False
+    
+    def _grab(self):
+        seq = 0
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            ret, frame = self.cam.read()
+            if not ret:
+                break
+            self.stats.add("grab", time.perf_counter() - start)
+            
+            if self.latest.item is not None:
+                self.stats.drop("grab")
+            self.latest.put(FrameResult(seq, start, frame))
+            seq += 1
+        self.latest.close()
+    
+    def _detect(self):
+        while not self.stopped.is_set():
+            result = self.latest.take()
+            if result is None:
+                if self.latest.closed:
+                    break
+                continue
+            
+            with self.stats.time("detect"):
+                result.gray = cv2.cvtColor(result.frame, cv2.COLOR_BGR2GRAY)
+                result.faces = self.detect(result.gray)
+                if self.track is not None:
+                    result.tracks = self.track(result.faces)
+            self._put(self.detected, result, "detect")
+        
+        for _ in range(self.config.recognition_workers):
+            self._put(self.detected, _END, "detect")
+    
+    def _recognize(self):
+        while not self.stopped.is_set():
+            try:
+                result = self.detected.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if result is _END:
+                break
+            
+            with self.stats.time("recognize"):
+                result.predictions = self.recognize(result.gray, result.faces, result.tracks)
+            self._put(self.results, result, "recognize")
+        
+        self._put(self.results, _END, "recognize")
+    
+    def next_result(self):
+        """Block until the next frame is ready; None once the camera stream has ended"""
+        while not self.stopped.is_set():
+            try:
+                result = self.results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            
+            if result is _END:
+                self.finished_workers += 1
+                if self.finished_workers == self.config.recognition_workers:
+                    return None
+                continue
+            
+            # Workers can finish out of order; never show an older frame
+            if result.seq < self.last_seq:
+                self.stats.drop("render")
+                continue
+            self.last_seq = result.seq
+            return result
+        return None
@@ -0,0 +1,226 @@
+import argparse
+import datetime
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import pandas as pd
+from face_detection import DetectionScheduler, create_detector
+from face_tracker import FaceTracker
+from lbph_model import convert_model, fast_model_is_current, load_recognizer
+from recognize_attendance import AttendanceSession, load_student_data, lookup_name, recognize_stream, store_session
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+# Shorter segments are not worth a seek and a fresh detector and tracker
+MIN_SEGMENT_FRAMES = 300
+
+# Loaded once per worker process by init_worker
+_recognizer = None
+
+def list_videos(path):
+    """List the video files of a directory in name order"""
+    if not os.path.isdir(path):
+        print(f"❌ Error: Video directory '{path}' not found")
+        return []
+    
+    videos = sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(VIDEO_EXTENSIONS))
+    if not videos:
+        print(f"❌ Error: No video files found in '{path}'")
+    return videos
+
+def init_worker():
+    """Load the recognizer once per worker process"""
+    global _recognizer
+    # Parallelism comes from the process pool, not from OpenCV threads
+    cv2.setNumThreads(1)
+    _recognizer = load_recognizer()
+
+def recording_start(cam, video_path):
+    """Estimate when a video started recording from its modification time and length"""
+    fps = cam.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = cam.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+    duration = frame_count / fps if fps > 0 else 0.0
+    end = datetime.datetime.fromtimestamp(os.path.getmtime(video_path))
+    return end - datetime.timedelta(seconds=duration), fps
+
+def frame_count(video_path):
+    """Number of frames of a video, or 0 if the container does not say"""
+    cam = cv2.VideoCapture(video_path)
+    try:
+        return int(cam.get(cv2.CAP_PROP_FRAME_COUNT) or 0) if cam.isOpened() else 0
+    finally:
+        cam.release()
+
+def plan_segments(videos, workers, stride=1):
+    """Split the videos into (video_path, start_frame, end_frame) segments for the pool
+    
+    A long recording is cut into frame ranges so all workers share it;
+    videos shorter than MIN_SEGMENT_FRAMES, or of unknown length, stay
+    whole (end_frame None). Segment starts are multiples of stride, so the
+    same frames are processed as in a single pass.
+    """
+    counts = {video: frame_count(video) for video in videos}
+    total = sum(counts.values())
+    size = max(MIN_SEGMENT_FRAMES, math.ceil(total / max(1, workers)))
+    size = math.ceil(size / stride) * stride
+    
+    segments = []
+    for video in videos:
+        if counts[video] <= size:
+            segments.append((video, 0, None))
+            continue
+        for start in range(0, counts[video], size):
+            end = start + size
+            segments.append((video, start, end if end < counts[video] else None))
+    return segments
+
+def process_video(video_path, stride=1, start_frame=0, end_frame=None):
+    """Recognize one video file, or the frames start_frame up to end_frame of it, without display
+    
+    Returns (video_path, sightings, frames, seconds), where sightings lists
+    (student_id, confidence_score, timestamp) with the timestamp placed in
+    the recording by frame position.
+    """
+    start = time.perf_counter()
+    cam = cv2.VideoCapture(video_path)
+    if not cam.isOpened():
+        raise ValueError("could not open video")
+    
+    started_at, fps = recording_start(cam, video_path)
+    if start_frame:
+        cam.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    detector = create_detector(scale_factor=1.2, min_neighbors=5)
+    if detector is None:
+        raise ValueError("face detector model not found")
+    scheduler = DetectionScheduler(detector, min_size=(64, 48))
+    tracker = FaceTracker()
+    
+    sightings = []
+    frames = 0
+    try:
+        for frame_index, present in recognize_stream(cam, scheduler, _recognizer, tracker, stride):
+            frame_index += start_frame
+            if end_frame is not None and frame_index >= end_frame:
+                break
+            frames += 1
+            offset = frame_index / fps if fps > 0 else 0.0
+            timestamp = started_at + datetime.timedelta(seconds=offset)
+            sightings.extend((student_id, score, timestamp) for student_id, score in present)
+    finally:
+        cam.release()
+    
+    return video_path, sightings, frames, time.perf_counter() - start
+
+def build_attendance(sightings, students):
+    """First sighting of every student as an Id,Name,Date,Time table"""
+    records = []
+    seen = set()
+    for student_id, _, timestamp in sorted(sightings, key=lambda sighting: sighting[2]):
+        if student_id in seen:
+            continue
+        seen.add(student_id)
+        records.append({
+            'Id': student_id,
+            'Name': lookup_name(students, student_id),
+            'Date': timestamp.strftime('%Y-%m-%d'),
+            'Time': timestamp.strftime('%H:%M:%S'),
+        })
+    return pd.DataFrame(records, columns=AttendanceSession.COLUMNS)
+
+def save_video_attendance(attendance_df, video_path, output_dir="Attendance"):
+    """Save the attendance of one video as Attendance_<video name>.csv"""
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    filepath = os.path.join(output_dir, f"Attendance_{name}.csv")
+    attendance_df.to_csv(filepath, index=False)
+    store_session(filepath, attendance_df.itertuples(index=False))
+    return filepath
+
+def batch_attendance(video_dir, stride=1, workers=None, output_dir="Attendance"):
+    """Take attendance from every video in a directory using a process pool
+    
+    Long videos are split into frame ranges so that one recording still
+    uses every worker. Tracks restart at each range, and a student seen in
+    several ranges keeps their first sighting. Returns a dict mapping each
+    processed video to its attendance table.
+    """
+    try:
+        if not os.path.exists("trainer.yml"):
+            print("❌ Error: trainer.yml not found. Please train the model first.")
+            return None
+        
+        videos = list_videos(video_dir)
+        if not videos:
+            return None
+        
+        students = load_student_data()
+        if students is None:
+            return None
+        
+        # Convert once here so the workers all map the same fast model files
+        if not fast_model_is_current():
+            convert_model()
+        
+        workers = workers or os.cpu_count() or 1
+        segments = plan_segments(videos, workers, stride)
+        workers = min(workers, len(segments))
+        print(f"🎞️ Processing {len(videos)} videos in {len(segments)} segments with {workers} workers "
+              f"(stride {stride})")
+        
+        results = {}
+        total_frames = 0
+        start = time.perf_counter()
+        remaining = {video: sum(segment[0] == video for segment in segments) for video in videos}
+        partial = {video: ([], 0, 0.0) for video in videos}
+        failed = set()
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            futures = {executor.submit(process_video, video, stride, first, last): video
+                       for video, first, last in segments}
+            for future in as_completed(futures):
+                video = futures[future]
+                remaining[video] -= 1
+                try:
+                    _, sightings, frames, seconds = future.result()
+                    video_sightings, video_frames, video_seconds = partial[video]
+                    partial[video] = (video_sightings + sightings, video_frames + frames, video_seconds + seconds)
+                except Exception as e:
+                    if video not in failed:
+                        print(f"❌ {os.path.basename(video)}: {e}")
+                    failed.add(video)
+                if remaining[video] or video in failed:
+                    continue
+                
+                sightings, frames, seconds = partial.pop(video)
+                attendance = build_attendance(sightings, students)
+                filepath = save_video_attendance(attendance, video, output_dir)
+                results[video] = attendance
+                total_frames += frames
+                
+                fps = frames / seconds if seconds > 0 else 0.0
+                print(f"✅ {os.path.basename(video)}: {len(attendance)} present, "
+                      f"{frames} frames at {fps:.1f} FPS per worker -> {filepath}")
+        
+        elapsed = time.perf_counter() - start
+        fps = total_frames / elapsed if elapsed > 0 else 0.0
+        print("\n📊 Batch throughput")
+        print("-" * 40)
+        print(f"Frames processed: {total_frames} in {elapsed:.1f}s")
+        print(f"Total: {fps:.1f} frames/sec")
+        print(f"Per core: {fps / workers:.1f} frames/sec")
+        return results
+    
+    except Exception as e:
+        print(f"❌ Error in batch attendance: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Take attendance from recorded video files")
+    parser.add_argument("video_dir", help="directory of video files")
+    parser.add_argument("--stride", type=int, default=1, help="process every n-th frame")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: all cores)")
+    parser.add_argument("--output", default="Attendance", help="directory for the attendance CSVs")
+    args = parser.parse_args()
+    
+    batch_attendance(args.video_dir, args.stride, args.workers, args.output)
@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import cv2
+import numpy as np
+from embedding_model import SFACE_MODEL_PATH, EmbeddingModel, FaceEmbedder, IVFIndex
+from face_cache import FaceCache
+from face_detection import DEFAULT_MODELS, DetectionConfig, DetectionScheduler, create_detector
+from face_tracker import FaceTracker, iou
+from image_loader import FACE_SIZE, peak_rss_mb
+from lbph_model import LBPHModel, load_fast_model, predict_faces, save_fast_model
+from perf_metrics import StageStats
+from recognize_attendance import recognize_stream
+from train_model import scan_training_images, train_full
+
+def student_pattern(student_id, size=FACE_SIZE, seed=0):
+    """Smooth random grayscale pattern standing in for one student's face"""
+    rng = np.random.default_rng((seed, student_id))
+    noise = rng.integers(0, 256, (size[1] // 8, size[0] // 8), dtype=np.uint8)
+    pattern = cv2.resize(noise, size, interpolation=cv2.INTER_CUBIC)
+    cv2.ellipse(pattern, (size[0] // 2, size[1] // 2), (size[0] // 3, size[1] // 2 - 10), 0, 0, 360,
+                int(rng.integers(60, 200)), 3)
+    return pattern
+
+def sample_face(pattern, rng):
+    """One capture of a pattern with a small shift, brightness change and noise"""
+    h, w = pattern.shape
+    dx, dy = rng.integers(-4, 5, 2)
+    shift = np.float32([[1, 0, dx], [0, 1, dy]])
+    face = cv2.warpAffine(pattern, shift, (w, h), borderMode=cv2.BORDER_REFLECT)
+    face = face.astype(np.int16) + int(rng.integers(-20, 21)) + rng.normal(0, 6, face.shape).astype(np.int16)
+    return np.clip(face, 0, 255).astype(np.uint8)
+
+def make_dataset(directory, students, images_per_student, seed=0):
+    """Write a synthetic training set named like captured images (name.id.sample.jpg)"""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for student_id in range(1, students + 1):
+        pattern = student_pattern(student_id, seed=seed)
+        for sample in range(1, images_per_student + 1):
+            filename = f"Student{student_id}.{student_id}.{sample}.jpg"
+            cv2.imwrite(os.path.join(directory, filename), sample_face(pattern, rng))
+
+def bench_training(dataset_dir, work_dir):
+    """Time a full training run through the packed cache"""
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    cache = FaceCache(os.path.join(work_dir, "cache"))
+    
+    start = time.perf_counter()
+    students = scan_training_images(dataset_dir)
+    train_full(recognizer, cache, students, dataset_dir)
+    seconds = time.perf_counter() - start
+    
+    model_path = os.path.join(work_dir, "trainer.yml")
+    fast_path = os.path.join(work_dir, "trainer_model")
+    recognizer.save(model_path)
+    save_fast_model(recognizer, fast_path)
+    
+    images = sum(len(files) for files in students.values())
+    return model_path, fast_path, {
+        "images": images,
+        "seconds": seconds,
+        "images_per_second": images / seconds if seconds > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_model_load(model_path, fast_path):
+    """Time loading the YAML model and opening the fast model"""
+    start = time.perf_counter()
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+    yaml_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    model = load_fast_model(fast_path)
+    fast_seconds = time.perf_counter() - start
+    
+    return model, {
+        "yaml_seconds": yaml_seconds,
+        "fast_seconds": fast_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_prediction(model, students, faces_per_student=5, batch_size=4, seed=1):
+    """Per-face prediction latency and accuracy on unseen synthetic captures"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for student_id in range(1, students + 1):
+        pattern = student_pattern(student_id)
+        queries += [(student_id, sample_face(pattern, rng)) for _ in range(faces_per_student)]
+    if not queries:
+        return {"faces": 0, "batch_size": batch_size, "accuracy": 0.0}
+    
+    stats = StageStats(window=len(queries))
+    correct = 0
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        with stats.time("predict"):
+            predictions = predict_faces(model, [face for _, face in batch])
+        correct += sum(label == student_id for (student_id, _), (label, _) in zip(batch, predictions))
+    
+    summary = stats.summary()["predict"]
+    return {
+        "faces": len(queries),
+        "batch_size": batch_size,
+        "batch_mean_ms": summary["mean_ms"],
+        "batch_p95_ms": summary["p95_ms"],
+        "per_face_ms": summary["mean_ms"] / batch_size,
+        "accuracy": correct / len(queries) if queries else 0.0,
+    }
+
+def bench_video(video_path, model, stride=1):
+    """Replay a video through the attendance loop's detection, tracking and recognition, timing each frame"""
+    cam = cv2.VideoCapture(video_path)
+    if not cam.isOpened():
+        return {"video": video_path, "error": "could not open video"}
+    
+    detector = create_detector(scale_factor=1.2, min_neighbors=5)
+    if detector is None:
+        return {"video": video_path, "error": "face detector model not found"}
+    scheduler = DetectionScheduler(detector, min_size=(64, 48))
+    stats = StageStats(window=100000)
+    frames = present = 0
+    start = time.perf_counter()
+    
+    for _, students in recognize_stream(cam, scheduler, model, FaceTracker(), stride, stats):
+        frames += 1
+        present += len(students)
+    
+    cam.release()
+    seconds = time.perf_counter() - start
+    return {
+        "video": video_path,
+        "frames": frames,
+        "students_present": present,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "stages": stats.summary(),
+        "full_frame_detections": scheduler.full_frame_runs,
+        "roi_detections": scheduler.roi_runs,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_engines(identities=(100, 1000, 10000), queries=200, seed=2):
+    """Per-face latency of LBPH and the embedding engine by roster size
+    
+    The gallery holds one synthetic capture per identity and is queried with
+    new captures of random identities. Synthetic captures are noise
+    patterns, not faces, so this measures latency only; SFace accuracy
+    needs real photos. The embedding engine is skipped when the SFace model
+    file is missing. At 10k identities the LBPH histograms take about 650 MB.
+    """
+    embedder = FaceEmbedder() if os.path.exists(SFACE_MODEL_PATH) else None
+    results = []
+    
+    for count in identities:
+        rng = np.random.default_rng(seed)
+        lbph = LBPHModel(np.zeros((0, 8 * 8 * 256), dtype=np.float32), np.zeros(0, dtype=np.int32))
+        histograms = []
+        embeddings = []
+        for start in range(1, count + 1, 500):
+            faces = [sample_face(student_pattern(i), rng) for i in range(start, min(start + 500, count + 1))]
+            histograms.append(lbph.histograms_of(faces))
+            if embedder is not None:
+                embeddings.append(embedder.embed(faces))
+        labels = np.arange(1, count + 1, dtype=np.int32)
+        lbph = LBPHModel(np.vstack(histograms), labels)
+        del histograms
+        
+        truth = rng.integers(1, count + 1, queries)
+        probes = [sample_face(student_pattern(int(i)), rng) for i in truth]
+        engines = {"lbph": lbph}
+        if embedder is not None:
+            engines["embedding"] = EmbeddingModel(embedder, IVFIndex.build(np.vstack(embeddings), labels))
+        
+        result = {"identities": count}
+        for engine, model in engines.items():
+            start = time.perf_counter()
+            for probe in probes:
+                model.predict(probe)
+            seconds = time.perf_counter() - start
+            result[engine] = {"per_face_ms": 1000 * seconds / queries}
+        results.append(result)
+    
+    return results
+
+def load_detection_fixtures(fixture_dir):
+    """Images and their annotated face boxes from fixture_dir/faces.json
+    
+    faces.json maps each image file name to a list of [x, y, w, h] boxes.
+    """
+    with open(os.path.join(fixture_dir, "faces.json")) as f:
+        annotations = json.load(f)
+    
+    fixtures = []
+    for filename, boxes in sorted(annotations.items()):
+        gray = cv2.imread(os.path.join(fixture_dir, filename), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            print(f"⚠️ Warning: Could not read fixture {filename}")
+            continue
+        fixtures.append((gray, [tuple(box) for box in boxes]))
+    return fixtures
+
+def bench_detector(backend, fixtures, min_size=(30, 30), match_iou=0.5):
+    """Full-frame detection latency, recall and false positives of one backend"""
+    detector = create_detector(DetectionConfig(backend=backend), scale_factor=1.2, min_neighbors=5)
+    if detector is None:
+        return {"backend": backend, "error": f"{DEFAULT_MODELS[backend]} not found"}
+    
+    stats = StageStats(window=max(1, len(fixtures)))
+    expected = found = false_positives = 0
+    for gray, boxes in fixtures:
+        with stats.time("detect"):
+            faces = detector.detect(gray, min_size)
+        
+        unmatched = list(faces)
+        for box in boxes:
+            best = max(unmatched, key=lambda face: iou(box, face), default=None)
+            if best is not None and iou(box, best) >= match_iou:
+                unmatched.remove(best)
+                found += 1
+        expected += len(boxes)
+        false_positives += len(unmatched)
+    
+    summary = stats.summary().get("detect", {"mean_ms": 0.0, "p95_ms": 0.0})
+    return {
+        "backend": backend,
+        "images": len(fixtures),
+        "mean_ms": summary["mean_ms"],
+        "p95_ms": summary["p95_ms"],
+        "recall": found / expected if expected else 0.0,
+        "false_positives": false_positives,
+    }
+
+def run_benchmarks(students=20, images_per_student=30, dataset_dir=None, videos=(), stride=1,
+                   detection_fixtures=None, backends=tuple(DEFAULT_MODELS), engine_sizes=()):
+    """Run every benchmark and return the results as a JSON-ready dict"""
+    results = {
+        "config": {
+            "students": students,
+            "images_per_student": images_per_student,
+            "dataset": dataset_dir or "synthetic",
+            "stride": stride,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+    }
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        if dataset_dir is None:
+            dataset_dir = os.path.join(work_dir, "TrainingImage")
+            start = time.perf_counter()
+            make_dataset(dataset_dir, students, images_per_student)
+            results["dataset_seconds"] = time.perf_counter() - start
+        
+        model_path, fast_path, results["training"] = bench_training(dataset_dir, work_dir)
+        model, results["model_load"] = bench_model_load(model_path, fast_path)
+        if results["config"]["dataset"] == "synthetic":
+            results["prediction"] = bench_prediction(model, students)
+        results["videos"] = [bench_video(video, model, stride) for video in videos]
+    
+    if engine_sizes:
+        results["engines"] = bench_engines(engine_sizes)
+    
+    if detection_fixtures:
+        fixtures = load_detection_fixtures(detection_fixtures)
+        results["detection"] = [bench_detector(backend, fixtures) for backend in backends]
+    
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark training, model loading and recognition")
+    parser.add_argument("--students", type=int, default=20, help="synthetic roster size")
+    parser.add_argument("--images", type=int, default=30, help="synthetic images per student")
+    parser.add_argument("--dataset", help="train on this image directory instead of synthetic faces")
+    parser.add_argument("--video", action="append", default=[], help="video file to replay (repeatable)")
+    parser.add_argument("--stride", type=int, default=1, help="process every n-th video frame")
+    parser.add_argument("--detection-fixtures", metavar="DIR",
+                        help="compare detector backends on the images annotated in DIR/faces.json")
+    parser.add_argument("--backends", default=",".join(DEFAULT_MODELS), help="detector backends to compare")
+    parser.add_argument("--engines", metavar="SIZES",
+                        help="time LBPH and embedding recognition at these roster sizes, e.g. 100,1000,10000")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+    
+    results = run_benchmarks(args.students, args.images, args.dataset, args.video, args.stride,
+                             args.detection_fixtures, args.backends.split(","),
+                             [int(size) for size in args.engines.split(",")] if args.engines else ())
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+        print(f"📊 Benchmark results saved to {args.output}")
+    else:
+        print(report)
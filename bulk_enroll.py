@@ -0,0 +1,237 @@
+import argparse
+import csv
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from attendance_db import import_if_empty, record_capture, save_student
+from capture_image import cache_faces, create_directories
+from enrollment import EnrollmentConfig, SampleSelector, SampleWriter
+from face_detection import DetectionConfig, create_detector
+from train_model import TRAINING_PATH, train_model
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+STUDENT_PATTERN = re.compile(r"^(\d+)[ _.-]+(.+)$")
+STUDENTS_CSV = os.path.join("StudentDetails", "StudentDetails.csv")
+ERRORS_CSV = "bulk_enroll_errors.csv"
+PROGRESS_INTERVAL = 2.0
+
+# Loaded once per worker process by init_worker
+_detector = None
+
+def parse_student(name):
+    """(student_id, name) from a name like "1234_Ada Lovelace", or None"""
+    match = STUDENT_PATTERN.match(os.path.splitext(name)[0])
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2).replace("_", " ").strip()
+
+def photo_config(max_samples=20):
+    """Sample selection for ID photos: posed single images, so only unusable ones are dropped"""
+    return EnrollmentConfig(max_samples=max_samples, min_sharpness=20.0, min_distance=0.05)
+
+def walk_photos(root):
+    """(path, student_id, name) for every photo under root
+    
+    A photo belongs to the student named by its directory
+    (root/1234_Ada/*.jpg) or, directly under root, by its file name
+    (root/1234_Ada.jpg). Photos matching neither are returned with
+    student None so they show up in the error report.
+    """
+    photos = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        owner = parse_student(os.path.basename(directory)) if directory != root else None
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            student = owner or parse_student(filename)
+            path = os.path.join(directory, filename)
+            photos.append((path,) + (student or (None, None)))
+    return photos
+
+def read_manifest(manifest_path):
+    """(path, student_id, name) rows of a CSV with Id, Name and Path columns
+    
+    Relative paths are taken relative to the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    photos = []
+    with open(manifest_path, newline='') as f:
+        for row in csv.DictReader(f):
+            path = os.path.join(base, row.get("Path") or "")
+            try:
+                photos.append((path, int(float(row["Id"])), row["Name"].strip()))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                photos.append((path, None, None))
+    return photos
+
+def align_face(gray, box, eyes=None):
+    """Crop a face, first rotating the image so the eyes are level when they are known"""
+    x, y, w, h = box
+    if eyes is not None:
+        (right_x, right_y), (left_x, left_y) = eyes
+        angle = math.degrees(math.atan2(left_y - right_y, left_x - right_x))
+        if abs(angle) > 1.0:
+            rotation = cv2.getRotationMatrix2D((x + w / 2, y + h / 2), angle, 1.0)
+            gray = cv2.warpAffine(gray, rotation, (gray.shape[1], gray.shape[0]),
+                                  flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    return gray[y:y + h, x:x + w]
+
+def init_worker(detection_config):
+    """Load the face detector once per worker process"""
+    global _detector
+    # Parallelism comes from the process pool, not from OpenCV threads
+    cv2.setNumThreads(1)
+    _detector = create_detector(detection_config, 1.1, 5)
+
+def process_photo(photo):
+    """Detect and align the largest face of one photo
+    
+    Returns (photo, face crop or None, error or None).
+    """
+    path, student_id, _ = photo
+    if student_id is None:
+        return photo, None, "no student ID in the directory, file name or manifest row"
+    if _detector is None:
+        return photo, None, "face detector model not found"
+    
+    try:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return photo, None, "could not decode image"
+        
+        min_side = max(30, int(0.1 * min(gray.shape)))
+        faces = _detector.detect_eyes(gray, (min_side, min_side))
+        if not faces:
+            return photo, None, "no face found"
+        
+        # ID photos show one person; anything smaller is background
+        box, eyes = max(faces, key=lambda face: face[0][2] * face[0][3])
+        return photo, align_face(gray, box, eyes), None
+    except Exception as e:
+        return photo, None, str(e)
+
+def file_name_part(name):
+    """Student name as used in training image names (name.id.sample.jpg)"""
+    return re.sub(r"[^A-Za-z0-9]", "", name) or "Student"
+
+def save_students(students):
+    """Add or rename students in the database and append new ones to StudentDetails.csv"""
+    import_if_empty()
+    new_rows = []
+    for student_id, name in students.items():
+        if save_student(student_id, name) is None:
+            new_rows.append([student_id, name])
+    
+    if new_rows:
+        file_exists = os.path.isfile(STUDENTS_CSV)
+        with open(STUDENTS_CSV, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(["Id", "Name"])
+            writer.writerows(new_rows)
+    return len(new_rows)
+
+def write_errors(errors, path=ERRORS_CSV):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Path", "Error"])
+        writer.writerows(errors)
+
+def bulk_enroll(source, workers=None, detection_config=None, enrollment_config=None, train=True):
+    """Enroll students from a directory of photos or a CSV manifest, then train"""
+    try:
+        create_directories()
+        photos = read_manifest(source) if os.path.isfile(source) else walk_photos(source)
+        if not photos:
+            print(f"❌ Error: No photos found in {source}")
+            return None
+        
+        detection_config = detection_config or DetectionConfig.load()
+        enrollment_config = enrollment_config or photo_config()
+        
+        print(f"📥 Enrolling from {len(photos)} photos with {workers or os.cpu_count()} processes")
+        start = time.perf_counter()
+        last_progress = start
+        selectors = {}
+        names = {}
+        kept = {}
+        new_files = {}
+        errors = []
+        writer = SampleWriter()
+        writer.start()
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(detection_config,)) as pool:
+            for done, (photo, crop, error) in enumerate(pool.map(process_photo, photos, chunksize=16), 1):
+                path, student_id, name = photo
+                if error is None:
+                    selector = selectors.setdefault(student_id, SampleSelector(enrollment_config))
+                    if len(selector) >= enrollment_config.max_samples:
+                        error = "student already has the maximum number of samples"
+                    else:
+                        face = selector.consider(crop)
+                        if face is None:
+                            error = "blurry or a near duplicate of another photo"
+                
+                if error is not None:
+                    errors.append((path, error))
+                else:
+                    names[student_id] = name
+                    filename = f"{file_name_part(name)}.{student_id}.import{len(selector)}.jpg"
+                    image_path = os.path.join(TRAINING_PATH, filename)
+                    if not os.path.exists(image_path):
+                        new_files.setdefault(student_id, set()).add(filename)
+                    writer.write(image_path, face)
+                    kept.setdefault(student_id, []).append((filename, face))
+                
+                now = time.perf_counter()
+                if now - last_progress >= PROGRESS_INTERVAL or done == len(photos):
+                    last_progress = now
+                    print(f"⏳ {done}/{len(photos)} photos | {sum(map(len, kept.values()))} faces kept | "
+                          f"{len(errors)} errors | {done / (now - start):.1f} photos/sec")
+        
+        failed = set(os.path.basename(path) for path in writer.close())
+        for path in failed:
+            errors.append((os.path.join(TRAINING_PATH, path), "could not write training image"))
+        elapsed = time.perf_counter() - start
+        
+        new_students = save_students(names)
+        for student_id, faces in kept.items():
+            faces = [(filename, face) for filename, face in faces if filename not in failed]
+            cache_faces(student_id, faces)
+            added = len(new_files.get(student_id, set()) - failed)
+            if added:
+                record_capture(student_id, added)
+        
+        faces_kept = sum(map(len, kept.values())) - len(failed)
+        print(f"✅ Enrolled {len(names)} students ({new_students} new) with {faces_kept} faces "
+              f"in {elapsed:.1f}s ({len(photos) / elapsed:.1f} photos/sec)")
+        if errors:
+            write_errors(errors)
+            print(f"⚠️ {len(errors)} photos were skipped; see {ERRORS_CSV}")
+            for path, error in errors[:5]:
+                print(f"   {path}: {error}")
+        
+        if train and names:
+            train_model(incremental=True)
+        
+        return {"photos": len(photos), "students": len(names), "faces": faces_kept, "errors": len(errors),
+                "seconds": elapsed}
+    
+    except Exception as e:
+        print(f"❌ Error during bulk enrollment: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enroll students from existing photos")
+    parser.add_argument("source", help="photo directory (ID_Name folders or files) or a CSV manifest (Id,Name,Path)")
+    parser.add_argument("--workers", type=int, help="detection processes (default: one per core)")
+    parser.add_argument("--max-samples", type=int, default=20, help="most photos kept per student (default: 20)")
+    parser.add_argument("--no-train", action="store_true", help="do not train the model afterwards")
+    args = parser.parse_args()
+    
+    bulk_enroll(args.source, args.workers, enrollment_config=photo_config(args.max_samples), train=not args.no_train)
@@ -1,18 +1,21 @@
+import time
 import cv2
+from face_detection import DetectionConfig, DetectionScheduler, create_detector
+from perf_metrics import Instrumentation
 
-def test_camera():
+def test_camera(detection_config=None, metrics_config=None):
     """Test camera and face detection functionality"""
     print("🎥 Testing camera and face detection...")
     print("📝 This will help verify your setup is working correctly")
     
     try:
-        # Load face cascade
-        cascade_path = "haarcascade_frontalface_default.xml"
-        if not os.path.exists(cascade_path):
-            print("❌ Error: haarcascade_frontalface_default.xml not found")
+        # Load face detector
+        detection_config = detection_config or DetectionConfig.load()
+        detector = create_detector(detection_config, 1.3, 5)
+        if detector is None:
             return False
         
-        face_cascade = cv2.CascadeClassifier(cascade_path)
+        scheduler = DetectionScheduler(detector, detection_config, min_size=(30, 30))
         
         # Initialize camera
         cap = cv2.VideoCapture(0)
@@ -24,23 +27,21 @@ def test_camera():
         print("👀 Look at the camera - you should see rectangles around detected faces")
         print("🚪 Press 'q' to quit")
         
+        metrics = Instrumentation("camera_test", metrics_config)
         while True:
-            ret, frame = cap.read()
+            captured_at = time.perf_counter()
+            with metrics.time("capture"):
+                ret, frame = cap.read()
             if not ret:
                 print("❌ Error: Could not read from camera")
                 break
             
-            # Convert to grayscale for face detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Detect faces
-            faces = face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=1.3, 
-                minNeighbors=5, 
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
+            with metrics.time("detect"):
+                # Convert to grayscale for face detection
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                
+                # Detect faces
+                faces = scheduler.detect(gray)
             
             # Draw rectangles around faces
             for (x, y, w, h) in faces:
@@ -52,13 +53,18 @@ def test_camera():
             cv2.putText(frame, f"Faces: {len(faces)}", (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
             
-            cv2.imshow('Camera Test - Press Q to quit', frame)
+            metrics.annotate(frame)
+            with metrics.time("display"):
+                cv2.imshow('Camera Test - Press Q to quit', frame)
+                key = cv2.waitKey(1) & 0xFF
+            metrics.frame_done(captured_at)
             
             # Quit on 'q' key
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if key == ord('q'):
                 break
         
         cap.release()
+        metrics.close()
         cv2.destroyAllWindows()
         print("✅ Camera test completed successfully")
         return True
@@ -1,6 +1,12 @@
 import csv
 import cv2
 import os
+import time
+from attendance_db import import_if_empty, record_capture, save_student
+from enrollment import SampleSelector, SampleWriter
+from face_cache import FaceCache
+from face_detection import DetectionConfig, DetectionScheduler, create_detector
+from perf_metrics import Instrumentation
 
 def is_number(s):
     """Check if a string represents a number"""
@@ -17,8 +23,8 @@ def create_directories():
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-def take_images():
-    """Capture face images for training"""
+def take_images(detection_config=None, metrics_config=None, enrollment_config=None):
+    """Capture sharp, varied face images for training"""
     # Create directories
     create_directories()
     
@@ -42,62 +48,118 @@ def take_images():
             return
             
         # Load face detector
-        cascade_path = "haarcascade_frontalface_default.xml"
-        if not os.path.exists(cascade_path):
-            print("❌ Error: haarcascade_frontalface_default.xml not found")
+        detection_config = detection_config or DetectionConfig.load()
+        detector = create_detector(detection_config, 1.3, 5)
+        if detector is None:
             return
             
-        detector = cv2.CascadeClassifier(cascade_path)
+        scheduler = DetectionScheduler(detector, detection_config, min_size=(30, 30))
         
         print(f"📸 Starting image capture for {name} (ID: {student_id})")
         print("👀 Look at the camera and press 'q' to quit early")
         
-        sample_count = 0
-        max_samples = 100
+        selector = SampleSelector(enrollment_config)
+        max_samples = selector.config.max_samples
+        writer = SampleWriter()
+        writer.start()
+        captured = []
+        new_files = set()
+        metrics = Instrumentation("capture", metrics_config)
+        started = time.monotonic()
         
         while True:
-            ret, img = cam.read()
+            captured_at = time.perf_counter()
+            with metrics.time("capture"):
+                ret, img = cam.read()
             if not ret:
                 print("❌ Error: Could not read from camera")
                 break
                 
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = detector.detectMultiScale(gray, 1.3, 5, minSize=(30, 30))
+            with metrics.time("detect"):
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                faces = scheduler.detect(gray)
             
-            for (x, y, w, h) in faces:
-                # Draw rectangle around face
+            if len(faces):
+                # Only the student being enrolled, the largest face, is sampled
+                x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
                 cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
                 
-                # Save face image
-                sample_count += 1
-                filename = f"{name}.{student_id}.{sample_count}.jpg"
-                filepath = os.path.join("TrainingImage", filename)
-                cv2.imwrite(filepath, gray[y:y + h, x:x + w])
-                
-                # Show progress
-                cv2.putText(img, f"Capturing: {sample_count}/{max_samples}", 
-                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                # Keep the face only if it is sharp and unlike the kept ones
+                with metrics.time("select"):
+                    face = selector.consider(gray[y:y + h, x:x + w])
+                if face is not None:
+                    filename = f"{name}.{student_id}.{len(selector)}.jpg"
+                    path = os.path.join("TrainingImage", filename)
+                    if not os.path.exists(path):
+                        new_files.add(filename)
+                    writer.write(path, face)
+                    captured.append((filename, face))
+            
+            # Show progress
+            cv2.putText(img, f"Capturing: {len(selector)}/{max_samples}", 
+                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(img, f"Skipped: {selector.blurry} blurry, {selector.similar} similar",
+                       (10, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
             
-            cv2.imshow('Face Capture - Press Q to quit', img)
+            metrics.annotate(img)
+            with metrics.time("display"):
+                cv2.imshow('Face Capture - Press Q to quit', img)
+                key = cv2.waitKey(1) & 0xFF
+            metrics.frame_done(captured_at)
             
-            # Check for quit or max samples
-            if cv2.waitKey(1) & 0xFF == ord('q') or sample_count >= max_samples:
+            # Check for quit, max samples or timeout
+            timed_out = time.monotonic() - started >= selector.config.max_seconds
+            if key == ord('q') or len(selector) >= max_samples or timed_out:
                 break
         
         # Cleanup
         cam.release()
+        metrics.close()
         cv2.destroyAllWindows()
         
+        # Wait for the queued samples to reach the disk
+        failed = set(os.path.basename(path) for path in writer.close())
+        if failed:
+            print(f"⚠️ Warning: {len(failed)} images could not be saved")
+            captured = [(filename, face) for filename, face in captured if filename not in failed]
+        
         # Save student details to CSV
         save_student_details(student_id, name)
         
-        print(f"✅ Successfully captured {sample_count} images for {name}")
+        # Add the new faces to the packed training cache
+        cache_faces(student_id, captured)
+        update_status_index(student_id, len(new_files - failed))
+        
+        print(f"✅ Successfully captured {len(captured)} images for {name} "
+              f"(skipped {selector.blurry} blurry and {selector.similar} similar faces)")
         
     except Exception as e:
         print(f"❌ Error during image capture: {e}")
 
+def cache_faces(student_id, captured):
+    """Append captured (filename, face) crops to the training cache"""
+    try:
+        cache = FaceCache()
+        entries = []
+        for filename, face in captured:
+            mtime = os.stat(os.path.join("TrainingImage", filename)).st_mtime
+            entries.append((int(student_id), filename, mtime, face))
+        cache.append(entries)
+        cache.save()
+    except Exception as e:
+        # The trainer rebuilds missing cache entries from the JPEGs
+        print(f"⚠️ Warning: Could not update training cache: {e}")
+
+def update_status_index(student_id, new_images):
+    """Count the new images in the system status index"""
+    try:
+        record_capture(int(float(student_id)), new_images)
+    except Exception as e:
+        # The index is rebuilt from TrainingImage if it is lost
+        print(f"⚠️ Warning: Could not update status index: {e}")
+
 def save_student_details(student_id, name):
-    """Save student details to CSV file"""
+    """Save student details to the database and CSV file"""
     csv_path = os.path.join("StudentDetails", "StudentDetails.csv")
     header = ["Id", "Name"]
     row = [student_id, name]
@@ -106,6 +168,16 @@ def save_student_details(student_id, name):
     file_exists = os.path.isfile(csv_path)
     
     try:
+        import_if_empty()
+        previous = save_student(int(float(student_id)), name)
+        if previous is not None:
+            # Already registered; the database holds the current name
+            if previous != name:
+                print(f"📝 Student renamed: ID={student_id}, {previous} -> {name}")
+            else:
+                print(f"📝 Student already registered: ID={student_id}, Name={name}")
+            return
+        
         with open(csv_path, 'a', newline='') as csvfile:
             writer = csv.writer(csvfile)
             
@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import cv2
+import numpy as np
+from face_detection import DEFAULT_MODELS, load_yunet
+from lbph_model import replace_directory
+
+SFACE_MODEL_PATH = "face_recognition_sface_2021dec.onnx"
+EMBEDDING_MODEL_PATH = "embedding_model"
+EMBEDDINGS_FILE = "embeddings.npy"
+LABELS_FILE = "labels.npy"
+LIST_CENTROIDS_FILE = "list_centroids.npy"
+LIST_OFFSETS_FILE = "list_offsets.npy"
+PARAMS_FILE = "params.json"
+SFACE_INPUT_SIZE = (112, 112)
+ALIGN_SCORE_THRESHOLD = 0.6
+EXACT_SEARCH_MAX = 4096
+
+# SFace's cosine similarity threshold for "same person" maps to the LBPH
+# distance at which recognize_attendance marks a student present
+SFACE_MATCH_COSINE = 0.363
+PRESENT_DISTANCE = 30.0
+
+def cosine_to_distance(similarity):
+    """Map cosine similarity onto the LBPH-like distance scale used for confidence"""
+    return PRESENT_DISTANCE * (1.0 - similarity) / (1.0 - SFACE_MATCH_COSINE)
+
+# A face no more similar than orthogonal to its closest student is unknown
+UNKNOWN_DISTANCE = cosine_to_distance(0.0)
+
+def normalize_rows(matrix):
+    """Scale every row to unit length"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+class FaceEmbedder:
+    """Fixed-length face embeddings from OpenCV's SFace model, run on the CPU
+    
+    SFace expects faces aligned by their landmarks, so every crop is first
+    run through YuNet and cut out with alignCrop(); without the YuNet model
+    file, or if YuNet misses the face, the crop is only resized. Training
+    and recognition go through the same path, so their embeddings match.
+    dnn networks must not run forward passes from two threads at once, so
+    every thread that embeds gets its own copies of both models.
+    """
+    
+    def __init__(self, model_path=SFACE_MODEL_PATH, detector_path=DEFAULT_MODELS["yunet"]):
+        self.model_path = model_path
+        self.detector_path = detector_path if detector_path and os.path.exists(detector_path) else None
+        self.local = threading.local()
+        # Load once up front so a missing model fails here, not mid-session
+        self.local.model = cv2.FaceRecognizerSF.create(model_path, "")
+    
+    @property
+    def model(self):
+        """This thread's SFace recognizer"""
+        model = getattr(self.local, "model", None)
+        if model is None:
+            model = self.local.model = cv2.FaceRecognizerSF.create(self.model_path, "")
+        return model
+    
+    @property
+    def detector(self):
+        """This thread's YuNet detector, or None without the model file"""
+        if self.detector_path is None:
+            return None
+        detector = getattr(self.local, "detector", None)
+        if detector is None:
+            detector = self.local.detector = load_yunet(self.detector_path, ALIGN_SCORE_THRESHOLD, shared=False)
+        return detector
+    
+    def align(self, face):
+        """112x112 BGR SFace input of a face crop, aligned by its YuNet landmarks when they are found"""
+        face = np.asarray(face)
+        image = cv2.cvtColor(face, cv2.COLOR_GRAY2BGR) if face.ndim == 2 else face
+        detector = self.detector
+        if detector is not None:
+            # YuNet misses faces that fill the whole image, so give it a margin
+            pad = max(image.shape[:2]) // 4
+            padded = cv2.copyMakeBorder(image, pad, pad, pad, pad, cv2.BORDER_REPLICATE)
+            detector.setInputSize((padded.shape[1], padded.shape[0]))
+            _, found = detector.detect(padded)
+            if found is not None and len(found):
+                largest = max(found, key=lambda row: row[2] * row[3])
+                return self.model.alignCrop(padded, largest)
+        return cv2.resize(image, SFACE_INPUT_SIZE, interpolation=cv2.INTER_AREA)
+    
+    def embed(self, faces):
+        """(faces, 128) matrix of unit-length embeddings of face crops"""
+        model = self.model
+        rows = []
+        for face in faces:
+            rows.append(model.feature(self.align(face)).ravel())
+        if not rows:
+            return np.zeros((0, 128), dtype=np.float32)
+        return normalize_rows(np.vstack(rows))
+
+class IVFIndex:
+    """Inverted-file index over unit vectors for approximate cosine search
+    
+    Vectors are clustered by k-means into nlist lists and stored grouped by
+    list. A query is compared with the list centroids first and then only
+    with the vectors of its nprobe closest lists, so lookups scan about
+    nprobe / nlist of the matrix. With one list the search is exact; that
+    is the default below EXACT_SEARCH_MAX vectors, where a full scan is
+    cheaper than probing.
+    """
+    
+    def __init__(self, vectors, labels, list_centroids, list_offsets, nprobe=16):
+        self.vectors = vectors
+        self.labels = labels
+        self.list_centroids = list_centroids
+        self.list_offsets = list_offsets
+        self.nprobe = nprobe
+    
+    @classmethod
+    def build(cls, vectors, labels, nlist=None, nprobe=16):
+        """Cluster vectors into lists; nlist defaults to about sqrt(len(vectors))"""
+        vectors = normalize_rows(vectors)
+        labels = np.asarray(labels, dtype=np.int32)
+        if nlist is None:
+            nlist = 1 if len(vectors) <= EXACT_SEARCH_MAX else int(np.sqrt(len(vectors)))
+        nlist = max(1, min(nlist, len(vectors)))
+        
+        if nlist == 1:
+            assignments = np.zeros(len(vectors), dtype=np.int32)
+            centroids = normalize_rows(vectors.sum(axis=0, keepdims=True))
+        else:
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1e-4)
+            _, assignments, centroids = cv2.kmeans(vectors, nlist, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+            assignments = assignments.ravel()
+            centroids = normalize_rows(centroids)
+        
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1)).astype(np.int64)
+        return cls(vectors[order], labels[order], centroids, offsets, nprobe)
+    
+    def search(self, queries):
+        """Best (label, cosine similarity) per query row"""
+        if len(self.list_centroids) == 1:
+            return self.exact_search(queries)
+        
+        queries = normalize_rows(queries)
+        if not len(self.labels) or not len(queries):
+            return [(-1, -1.0)] * len(queries)
+        
+        nprobe = min(self.nprobe, len(self.list_centroids))
+        coarse = queries @ self.list_centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        
+        results = []
+        for query, lists in zip(queries, probes):
+            # Lists are stored contiguously, so each probe is one slice
+            ranges = [(self.list_offsets[i], self.list_offsets[i + 1]) for i in lists]
+            vectors = np.concatenate([self.vectors[start:end] for start, end in ranges])
+            labels = np.concatenate([self.labels[start:end] for start, end in ranges])
+            if not len(labels):
+                results.append((-1, -1.0))
+                continue
+            similarities = vectors @ query
+            best = int(similarities.argmax())
+            results.append((int(labels[best]), float(similarities[best])))
+        return results
+    
+    def exact_search(self, queries):
+        """Best (label, cosine similarity) per query by scanning every vector"""
+        queries = normalize_rows(queries)
+        if not len(self.labels):
+            return [(-1, -1.0)] * len(queries)
+        similarities = queries @ np.asarray(self.vectors).T
+        best = similarities.argmax(axis=1)
+        return [(int(self.labels[b]), float(similarities[i, b])) for i, b in enumerate(best)]
+
+class EmbeddingModel:
+    """Recognizer matching SFace embeddings against one mean embedding per student
+    
+    Plugs into predict_faces() like LBPHModel: predict_batch() returns a
+    (label, distance) pair per face, with distance on the LBPH scale.
+    """
+    
+    def __init__(self, embedder, index, max_distance=UNKNOWN_DISTANCE):
+        self.embedder = embedder
+        self.index = index
+        self.max_distance = max_distance
+    
+    def predict(self, face):
+        return self.predict_batch([face])[0]
+    
+    def predict_batch(self, faces):
+        if not len(faces):
+            return []
+        
+        results = []
+        for label, similarity in self.index.search(self.embedder.embed(faces)):
+            distance = cosine_to_distance(similarity)
+            if label < 0 or distance >= self.max_distance:
+                results.append((-1, float(np.finfo(np.float64).max)))
+            else:
+                results.append((label, distance))
+        return results
+
+def student_embeddings(embeddings, labels):
+    """Return (student labels, unit-length mean embedding per student)"""
+    student_labels, inverse = np.unique(labels, return_inverse=True)
+    sums = np.zeros((len(student_labels), embeddings.shape[1]), dtype=np.float64)
+    np.add.at(sums, inverse, embeddings)
+    return student_labels.astype(np.int32), normalize_rows(sums)
+
+def save_embedding_model(index, path=EMBEDDING_MODEL_PATH):
+    """Write an index as .npy arrays that load_embedding_model memory-maps"""
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, EMBEDDINGS_FILE), np.asarray(index.vectors, dtype=np.float32))
+    np.save(os.path.join(tmp_path, LABELS_FILE), index.labels)
+    np.save(os.path.join(tmp_path, LIST_CENTROIDS_FILE), index.list_centroids)
+    np.save(os.path.join(tmp_path, LIST_OFFSETS_FILE), index.list_offsets)
+    with open(os.path.join(tmp_path, PARAMS_FILE), 'w') as f:
+        json.dump({"nprobe": index.nprobe, "sface_model": SFACE_MODEL_PATH}, f)
+    replace_directory(tmp_path, path)
+
+def load_embedding_model(path=EMBEDDING_MODEL_PATH, nprobe=None):
+    """Open an embedding model; the embedding matrix is memory-mapped"""
+    with open(os.path.join(path, PARAMS_FILE)) as f:
+        params = json.load(f)
+    
+    index = IVFIndex(
+        np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r'),
+        np.load(os.path.join(path, LABELS_FILE)),
+        np.load(os.path.join(path, LIST_CENTROIDS_FILE)),
+        np.load(os.path.join(path, LIST_OFFSETS_FILE)),
+        nprobe or params["nprobe"],
+    )
+    return EmbeddingModel(FaceEmbedder(params["sface_model"]), index)
+
+def train_embedding_model(chunks, embedder=None, path=EMBEDDING_MODEL_PATH, nprobe=16):
+    """Embed (faces, ids) chunks and save one mean embedding per student
+    
+    Returns the number of faces embedded and the number of students.
+    """
+    embedder = embedder or FaceEmbedder()
+    embeddings = []
+    labels = []
+    for faces, ids in chunks:
+        embeddings.append(embedder.embed(faces))
+        labels.append(np.asarray(ids, dtype=np.int32))
+    
+    if not embeddings:
+        return 0, 0
+    
+    embeddings = np.vstack(embeddings)
+    student_labels, means = student_embeddings(embeddings, np.concatenate(labels))
+    save_embedding_model(IVFIndex.build(means, student_labels, nprobe=nprobe), path)
+    return len(embeddings), len(student_labels)
+
+def benchmark_index(identities=(100, 1000, 10000), queries=500, dims=128, noise=0.6, nprobe=16, seed=0):
+    """Compare exact and IVF search latency and accuracy on synthetic embeddings"""
+    rng = np.random.default_rng(seed)
+    results = []
+    print("📊 Embedding index benchmark (ms per query)")
+    print("-" * 40)
+    
+    for count in identities:
+        gallery = normalize_rows(rng.normal(size=(count, dims)))
+        labels = np.arange(count, dtype=np.int32)
+        truth = rng.integers(0, count, queries)
+        probes = normalize_rows(gallery[truth] + noise * normalize_rows(rng.normal(size=(queries, dims))))
+        
+        start = time.perf_counter()
+        index = IVFIndex.build(gallery, labels, nlist=max(2, int(np.sqrt(count))), nprobe=nprobe)
+        build_seconds = time.perf_counter() - start
+        
+        # One query at a time, as a frame holds only a few faces
+        start = time.perf_counter()
+        exact = [index.exact_search(probe[np.newaxis])[0] for probe in probes]
+        exact_ms = 1000 * (time.perf_counter() - start) / queries
+        
+        start = time.perf_counter()
+        approximate = [index.search(probe[np.newaxis])[0] for probe in probes]
+        ivf_ms = 1000 * (time.perf_counter() - start) / queries
+        
+        result = {
+            "identities": count,
+            "build_seconds": build_seconds,
+            "exact_ms": exact_ms,
+            "ivf_ms": ivf_ms,
+            "exact_accuracy": float(np.mean([label == t for (label, _), t in zip(exact, truth)])),
+            "ivf_accuracy": float(np.mean([label == t for (label, _), t in zip(approximate, truth)])),
+        }
+        results.append(result)
+        print(f"{count:>6} identities: exact {exact_ms:.3f} ms ({result['exact_accuracy']:.1%}) | "
+              f"IVF {ivf_ms:.3f} ms ({result['ivf_accuracy']:.1%})")
+    
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding recognizer tools")
+    parser.add_argument("command", choices=["benchmark"])
+    args = parser.parse_args()
+    
+    benchmark_index()
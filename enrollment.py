@@ -0,0 +1,97 @@
+import queue
+import threading
+import cv2
+import numpy as np
+from image_loader import normalize_face
+
+class EnrollmentConfig:
+    """Which face samples to keep while enrolling a student
+    
+    A sample is kept only if its sharpness (variance of the Laplacian of the
+    normalized crop) is at least min_sharpness and its appearance differs
+    from every kept sample by at least min_distance (Bhattacharyya distance
+    of per-quadrant histograms). Capture ends after max_samples samples or
+    max_seconds. Zero thresholds keep every detected face.
+    """
+    
+    def __init__(self, max_samples=40, min_sharpness=60.0, min_distance=0.12, max_seconds=60.0):
+        self.max_samples = max_samples
+        self.min_sharpness = min_sharpness
+        self.min_distance = min_distance
+        self.max_seconds = max_seconds
+
+def sharpness(face):
+    """Variance of the Laplacian; low values mean a blurred face"""
+    return cv2.Laplacian(face, cv2.CV_64F).var()
+
+def appearance_signature(face, bins=32):
+    """Normalized histograms of the four quadrants of a face, concatenated"""
+    h, w = face.shape
+    cells = [face[:h // 2, :w // 2], face[:h // 2, w // 2:], face[h // 2:, :w // 2], face[h // 2:, w // 2:]]
+    histograms = [cv2.calcHist([cell], [0], None, [bins], [0, 256]).ravel() for cell in cells]
+    signature = np.concatenate(histograms).astype(np.float32)
+    return signature / max(float(signature.sum()), 1.0)
+
+class SampleSelector:
+    """Keeps sharp face samples that look different from the ones already kept"""
+    
+    def __init__(self, config=None):
+        self.config = config or EnrollmentConfig()
+        self.signatures = []
+        self.blurry = 0
+        self.similar = 0
+    
+    def __len__(self):
+        return len(self.signatures)
+    
+    def consider(self, crop):
+        """Return the normalized face if it should be kept, otherwise None"""
+        face = normalize_face(crop)
+        if sharpness(face) < self.config.min_sharpness:
+            self.blurry += 1
+            return None
+        
+        signature = appearance_signature(face)
+        for kept in self.signatures:
+            if cv2.compareHist(kept, signature, cv2.HISTCMP_BHATTACHARYYA) < self.config.min_distance:
+                self.similar += 1
+                return None
+        
+        self.signatures.append(signature)
+        return face
+
+class SampleWriter:
+    """Writes face samples to disk in a background thread
+    
+    write() only queues the image, so the capture loop does not wait on
+    JPEG encoding and disk I/O unless queue_size samples are still pending.
+    """
+    
+    def __init__(self, queue_size=32):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.failed = []
+        self.thread = threading.Thread(target=self._run, name="sample-writer", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+    
+    def write(self, path, image):
+        self.queue.put((path, image))
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, image = item
+            try:
+                if not cv2.imwrite(path, image):
+                    self.failed.append(path)
+            except Exception:
+                self.failed.append(path)
+    
+    def close(self):
+        """Wait for every queued sample to be written; returns the paths that failed"""
+        self.queue.put(None)
+        self.thread.join()
+        return self.failed
@@ -0,0 +1,217 @@
+import json
+import os
+import numpy as np
+from image_loader import CHUNK_SIZE, FACE_SIZE, LoaderStats, iter_face_chunks, normalize_face, parse_student_id
+
+CACHE_DIR = "TrainingCache"
+FACES_FILE = "faces.u8"
+INDEX_FILE = "index.npz"
+
+class FaceCache:
+    """Packed training set of fixed-size faces in one memory-mapped uint8 file
+    
+    Rows are only ever appended to the faces file. Replacing a student's
+    images marks their old rows invalid, and the file is compacted once more
+    than half of it is stale. For every student the cache remembers the
+    source images (name, mtime and row) so it can tell when they change.
+    """
+    
+    def __init__(self, cache_dir=CACHE_DIR, size=FACE_SIZE):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.labels = np.zeros(0, dtype=np.int32)
+        self.valid = np.zeros(0, dtype=bool)
+        self.sources = {}
+        self._faces = None
+        self._load()
+    
+    @property
+    def face_bytes(self):
+        return self.size[0] * self.size[1]
+    
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+    
+    def _load(self):
+        index_path = self._path(INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        
+        try:
+            index = np.load(index_path)
+            if tuple(index["size"]) != tuple(self.size):
+                print("⚠️ Warning: Face size changed, rebuilding training cache")
+                return
+            labels = index["labels"]
+            valid = index["valid"]
+            sources = json.loads(str(index["sources"]))
+            
+            if os.path.getsize(self._path(FACES_FILE)) < len(labels) * self.face_bytes:
+                print("⚠️ Warning: Training cache is truncated, rebuilding it")
+                return
+        except Exception as e:
+            print(f"⚠️ Warning: Could not read training cache, rebuilding it: {e}")
+            return
+        
+        self.labels = labels
+        self.valid = valid
+        self.sources = {int(student_id): files for student_id, files in sources.items()}
+    
+    def __len__(self):
+        return len(self.labels)
+    
+    @property
+    def faces(self):
+        """Memory-mapped (rows, height, width) view of every cached face"""
+        if self._faces is None:
+            if not len(self):
+                return np.zeros((0, self.size[1], self.size[0]), dtype=np.uint8)
+            self._faces = np.memmap(self._path(FACES_FILE), dtype=np.uint8, mode='r',
+                                    shape=(len(self), self.size[1], self.size[0]))
+        return self._faces
+    
+    def signature(self, student_id):
+        """Source images of a cached student as {filename: mtime}"""
+        files = self.sources.get(student_id)
+        if files is None:
+            return None
+        return {filename: mtime for filename, (mtime, _) in files.items()}
+    
+    def rows_for(self, student_ids=None):
+        """Indices of the valid rows, optionally only for the given students"""
+        mask = self.valid
+        if student_ids is not None:
+            mask = mask & np.isin(self.labels, list(student_ids))
+        return np.flatnonzero(mask)
+    
+    def append(self, entries):
+        """Append (student_id, filename, mtime, face) entries to the cache
+        
+        Rows previously cached for the same source images are marked stale.
+        Faces that could not be decoded are recorded with face None so the
+        source is not retried until it changes.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        row = len(self)
+        labels = []
+        
+        with open(self._path(FACES_FILE), 'ab') as f:
+            # Drop any bytes left behind by an interrupted append
+            f.truncate(row * self.face_bytes)
+            for student_id, filename, mtime, face in entries:
+                files = self.sources.setdefault(student_id, {})
+                stale = files.get(filename)
+                if stale is not None and stale[1] >= 0:
+                    self.valid[stale[1]] = False
+                
+                if face is None:
+                    files[filename] = [mtime, -1]
+                    continue
+                
+                f.write(np.ascontiguousarray(normalize_face(face, self.size)).tobytes())
+                files[filename] = [mtime, row + len(labels)]
+                labels.append(student_id)
+        
+        self.labels = np.concatenate([self.labels, np.array(labels, dtype=np.int32)])
+        self.valid = np.concatenate([self.valid, np.ones(len(labels), dtype=bool)])
+        self._faces = None
+    
+    def invalidate(self, student_id):
+        """Forget every cached face of a student"""
+        files = self.sources.pop(student_id, {})
+        rows = [row for _, row in files.values() if row >= 0]
+        self.valid[rows] = False
+    
+    def sync(self, training_path, students):
+        """Bring the cache in line with the training images on disk
+        
+        `students` maps student IDs to their {filename: mtime} on disk. Only
+        students whose images changed are decoded again. Returns the set of
+        students that were refreshed or removed.
+        """
+        stale = {
+            student_id for student_id in set(self.sources) | set(students)
+            if self.signature(student_id) != students.get(student_id)
+        }
+        if not stale:
+            return stale
+        
+        for student_id in stale:
+            self.invalidate(student_id)
+        
+        image_paths = [
+            os.path.join(training_path, filename)
+            for student_id in sorted(stale & set(students))
+            for filename in sorted(students[student_id])
+        ]
+        
+        if image_paths:
+            print(f"📦 Caching {len(image_paths)} images from {len(stale & set(students))} students")
+            stats = LoaderStats()
+            for faces, ids, paths in iter_face_chunks(image_paths, size=self.size, stats=stats, with_paths=True):
+                # Append per chunk so memory stays bounded
+                entries = []
+                for face, student_id, path in zip(faces, ids, paths):
+                    filename = os.path.basename(path)
+                    entries.append((int(student_id), filename, students[student_id][filename], face))
+                self.append(entries)
+            
+            # Remember images that failed to decode so they are not retried
+            failed = []
+            for path in image_paths:
+                filename = os.path.basename(path)
+                student_id = parse_student_id(filename)
+                if filename not in self.sources.get(student_id, {}):
+                    failed.append((student_id, filename, students[student_id][filename], None))
+            if failed:
+                self.append(failed)
+            stats.report()
+        
+        if (~self.valid).sum() > len(self) // 2:
+            self.compact()
+        self.save()
+        return stale
+    
+    def compact(self):
+        """Rewrite the faces file without stale rows"""
+        rows = self.rows_for()
+        remap = np.full(len(self), -1, dtype=np.int64)
+        remap[rows] = np.arange(len(rows))
+        
+        tmp_path = self._path(FACES_FILE + ".tmp")
+        faces = self.faces
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(rows), CHUNK_SIZE):
+                f.write(np.ascontiguousarray(faces[rows[start:start + CHUNK_SIZE]]).tobytes())
+        
+        self._faces = None
+        del faces
+        os.replace(tmp_path, self._path(FACES_FILE))
+        
+        self.labels = self.labels[rows]
+        self.valid = np.ones(len(rows), dtype=bool)
+        for files in self.sources.values():
+            for entry in files.values():
+                if entry[1] >= 0:
+                    entry[1] = int(remap[entry[1]])
+        
+        print(f"🧹 Compacted training cache to {len(rows)} faces")
+    
+    def save(self):
+        """Write the index; the faces file is already up to date"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        sources = json.dumps({str(student_id): files for student_id, files in self.sources.items()})
+        
+        # Replace the index in one step so readers never see a partial one
+        index_tmp = self._path("index.tmp.npz")
+        np.savez(index_tmp, labels=self.labels, valid=self.valid,
+                 size=np.array(self.size), sources=np.array(sources))
+        os.replace(index_tmp, self._path(INDEX_FILE))
+    
+    def iter_chunks(self, rows, chunk_size=CHUNK_SIZE):
+        """Yield (faces, ids) chunks of the given rows as zero-copy memmap views"""
+        faces = self.faces
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            yield [faces[row] for row in chunk], self.labels[chunk]
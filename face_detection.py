@@ -0,0 +1,231 @@
+import json
+import os
+import cv2
+import numpy as np
+
+CONFIG_PATH = "detection_config.json"
+DEFAULT_MODELS = {
+    "haar": "haarcascade_frontalface_default.xml",
+    "lbp": "lbpcascade_frontalface_improved.xml",
+    "yunet": "face_detection_yunet_2023mar.onnx",
+}
+
+class DetectionConfig:
+    """When and where to run face detection
+    
+    Full-frame detection runs every full_frame_interval frames or when
+    motion is seen outside the known faces, so an empty, still room is only
+    scanned every full_frame_interval frames. Other frames only search each
+    previous face expanded by roi_margin (a fraction of the face size).
+    Detection can run on an image scaled by downscale, with coordinates
+    mapped back to the full frame.
+    
+    backend picks the detector: "haar" (the default), "lbp" or "yunet".
+    model_path overrides the backend's default model file, and
+    score_threshold is the minimum YuNet face score.
+    """
+    
+    def __init__(self, full_frame_interval=5, roi_margin=0.5, downscale=1.0,
+                 motion_threshold=0.02, motion_pixel_delta=25, backend="haar", model_path=None,
+                 score_threshold=0.8):
+        if backend not in DEFAULT_MODELS:
+            raise ValueError(f"backend must be one of {tuple(DEFAULT_MODELS)}")
+        self.full_frame_interval = full_frame_interval
+        self.roi_margin = roi_margin
+        self.downscale = downscale
+        self.motion_threshold = motion_threshold
+        self.motion_pixel_delta = motion_pixel_delta
+        self.backend = backend
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+    
+    @classmethod
+    def load(cls, path=CONFIG_PATH):
+        """Read settings from a JSON file, falling back to the defaults"""
+        if not os.path.exists(path):
+            return cls()
+        
+        try:
+            with open(path) as f:
+                return cls(**json.load(f))
+        except Exception as e:
+            print(f"⚠️ Warning: Could not read {path}, using default detection settings: {e}")
+            return cls()
+
+# Models are loaded once per process and shared by every detector using them
+_models = {}
+
+def load_cascade(path, shared=True):
+    """cv2.CascadeClassifier for a cascade file, shared unless shared is False"""
+    if not shared:
+        return cv2.CascadeClassifier(path)
+    key = ("cascade", path)
+    if key not in _models:
+        _models[key] = cv2.CascadeClassifier(path)
+    return _models[key]
+
+def load_yunet(path, score_threshold=0.8, nms_threshold=0.3, shared=True):
+    """cv2.FaceDetectorYN for a YuNet model file, shared unless shared is False"""
+    if not shared:
+        return cv2.FaceDetectorYN.create(path, "", (320, 320), score_threshold, nms_threshold)
+    key = ("yunet", path, score_threshold, nms_threshold)
+    if key not in _models:
+        _models[key] = cv2.FaceDetectorYN.create(path, "", (320, 320), score_threshold, nms_threshold)
+    return _models[key]
+
+class CascadeDetector:
+    """Haar or LBP cascade classifier"""
+    
+    def __init__(self, cascade, scale_factor=1.3, min_neighbors=5):
+        self.cascade = cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+    
+    def detect_eyes(self, gray, min_size=(30, 30)):
+        """(box, eyes) per face; cascades do not locate the eyes, so eyes is None"""
+        return [(box, None) for box in self.detect(gray, min_size)]
+    
+    def detect(self, gray, min_size=(30, 30)):
+        faces = self.cascade.detectMultiScale(
+            gray, self.scale_factor, self.min_neighbors,
+            minSize=min_size,
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+class YuNetDetector:
+    """OpenCV's YuNet CNN face detector, run on the CPU"""
+    
+    def __init__(self, model):
+        self.model = model
+    
+    def detect(self, gray, min_size=(30, 30)):
+        return [box for box, _ in self.detect_eyes(gray, min_size)]
+    
+    def detect_eyes(self, gray, min_size=(30, 30)):
+        """(box, (right eye, left eye)) per face, eyes as (x, y) image points"""
+        height, width = gray.shape[:2]
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR) if gray.ndim == 2 else gray
+        self.model.setInputSize((width, height))
+        _, faces = self.model.detect(image)
+        if faces is None:
+            return []
+        
+        results = []
+        for face in faces:
+            x, y, w, h = (int(round(v)) for v in face[:4])
+            x, y = max(0, x), max(0, y)
+            w, h = min(w, width - x), min(h, height - y)
+            if w >= min_size[0] and h >= min_size[1]:
+                # YuNet landmarks start with the right and left eye
+                eyes = ((float(face[4]), float(face[5])), (float(face[6]), float(face[7])))
+                results.append(((x, y, w, h), eyes))
+        return results
+
+def create_detector(config=None, scale_factor=1.3, min_neighbors=5, shared=True):
+    """Build the configured detector backend, or None if its model file is missing
+    
+    scale_factor and min_neighbors only apply to the cascade backends.
+    Detectors share one loaded model per process; a detector used from a
+    thread of its own needs shared=False, since the OpenCV models must not
+    run from two threads at once.
+    """
+    config = config or DetectionConfig.load()
+    path = config.model_path or DEFAULT_MODELS[config.backend]
+    if not os.path.exists(path):
+        print(f"❌ Error: {path} not found")
+        return None
+    
+    if config.backend == "yunet":
+        return YuNetDetector(load_yunet(path, config.score_threshold, shared=shared))
+    return CascadeDetector(load_cascade(path, shared), scale_factor, min_neighbors)
+
+def merge_boxes(boxes, overlap=0.5):
+    """Drop boxes that mostly overlap an earlier one"""
+    kept = []
+    for box in boxes:
+        x, y, w, h = box
+        duplicate = False
+        for kx, ky, kw, kh in kept:
+            inter_w = min(x + w, kx + kw) - max(x, kx)
+            inter_h = min(y + h, ky + kh) - max(y, ky)
+            if inter_w > 0 and inter_h > 0 and inter_w * inter_h > overlap * min(w * h, kw * kh):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(box)
+    return kept
+
+class DetectionScheduler:
+    """Runs a detector on the full frame only when needed, and on ROIs otherwise
+    
+    detector is a backend from create_detector(); a bare cv2.CascadeClassifier
+    is also accepted and used with scale_factor and min_neighbors.
+    """
+    
+    MOTION_SCALE = 0.125
+    
+    def __init__(self, detector, config=None, scale_factor=1.3, min_neighbors=5, min_size=(30, 30)):
+        if hasattr(detector, "detectMultiScale"):
+            detector = CascadeDetector(detector, scale_factor, min_neighbors)
+        self.detector = detector
+        self.config = config or DetectionConfig.load()
+        self.min_size = min_size
+        self.frame_index = 0
+        self.previous_faces = []
+        self.previous_small = None
+        self.full_frame_runs = 0
+        self.roi_runs = 0
+    
+    def _detect(self, gray):
+        scale = self.config.downscale
+        min_size = self.min_size
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            min_size = (max(1, int(min_size[0] * scale)), max(1, int(min_size[1] * scale)))
+        
+        faces = self.detector.detect(gray, min_size)
+        return [tuple(int(round(v / scale)) for v in face) for face in faces]
+    
+    def _roi(self, face, shape):
+        x, y, w, h = face
+        margin_w = int(w * self.config.roi_margin)
+        margin_h = int(h * self.config.roi_margin)
+        x0, y0 = max(0, x - margin_w), max(0, y - margin_h)
+        x1, y1 = min(shape[1], x + w + margin_w), min(shape[0], y + h + margin_h)
+        return x0, y0, x1, y1
+    
+    def _motion_outside(self, gray):
+        """Whether enough pixels changed since the last frame outside the known faces"""
+        small = cv2.resize(gray, None, fx=self.MOTION_SCALE, fy=self.MOTION_SCALE,
+                           interpolation=cv2.INTER_AREA)
+        previous, self.previous_small = self.previous_small, small
+        if previous is None or previous.shape != small.shape:
+            return True
+        
+        changed = cv2.absdiff(small, previous) > self.config.motion_pixel_delta
+        for face in self.previous_faces:
+            x0, y0, x1, y1 = (int(v * self.MOTION_SCALE) for v in self._roi(face, gray.shape))
+            changed[y0:y1 + 1, x0:x1 + 1] = False
+        return np.count_nonzero(changed) > self.config.motion_threshold * changed.size
+    
+    def detect(self, gray):
+        """Detect faces in a grayscale frame as a list of (x, y, w, h)"""
+        motion = self._motion_outside(gray)
+        interval = max(1, self.config.full_frame_interval)
+        full_frame = motion or self.frame_index % interval == 0
+        self.frame_index += 1
+        
+        if full_frame:
+            self.full_frame_runs += 1
+            faces = self._detect(gray)
+        else:
+            self.roi_runs += 1
+            faces = []
+            for face in self.previous_faces:
+                x0, y0, x1, y1 = self._roi(face, gray.shape)
+                faces += [(x + x0, y + y0, w, h) for (x, y, w, h) in self._detect(gray[y0:y1, x0:x1])]
+            faces = merge_boxes(faces)
+        
+        self.previous_faces = faces
+        return faces
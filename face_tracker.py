@@ -0,0 +1,98 @@
+import threading
+from collections import Counter
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+class Track:
+    """A face followed across frames, with the identity votes collected for it"""
+    
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.missed = 0
+        self.votes = []
+        self.identity = None
+        self.latest = (-1, float("inf"))
+    
+    @property
+    def confirmed(self):
+        return self.identity is not None
+    
+    def result(self):
+        """Confirmed (student_id, confidence), or the latest prediction while voting"""
+        return self.identity if self.identity is not None else self.latest
+
+class FaceTracker:
+    """Associates detections across frames by IoU and votes each track's identity
+    
+    A track is recognized on its first vote_frames frames only. The most
+    frequent prediction then becomes its identity, with the mean distance
+    of those votes as its confidence, until the track is lost.
+    """
+    
+    def __init__(self, iou_threshold=0.3, max_missed=10, vote_frames=5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.vote_frames = vote_frames
+        self.tracks = []
+        self.next_id = 0
+        self.lock = threading.Lock()
+    
+    def update(self, faces):
+        """Match this frame's detections to tracks; returns one track per face"""
+        with self.lock:
+            pairs = sorted(
+                ((iou(track.box, face), t, f)
+                 for t, track in enumerate(self.tracks)
+                 for f, face in enumerate(faces)),
+                reverse=True,
+            )
+            
+            assigned = [None] * len(faces)
+            used = set()
+            for overlap, t, f in pairs:
+                if overlap < self.iou_threshold:
+                    break
+                if t in used or assigned[f] is not None:
+                    continue
+                used.add(t)
+                assigned[f] = self.tracks[t]
+                assigned[f].box = tuple(int(v) for v in faces[f])
+                assigned[f].missed = 0
+            
+            for t, track in enumerate(self.tracks):
+                if t not in used:
+                    track.missed += 1
+            self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+            
+            for f, face in enumerate(faces):
+                if assigned[f] is None:
+                    assigned[f] = Track(self.next_id, face)
+                    self.next_id += 1
+                    self.tracks.append(assigned[f])
+            
+            return assigned
+    
+    def add_vote(self, track, student_id, confidence):
+        """Record one prediction for a track and confirm it once enough have been seen"""
+        with self.lock:
+            if track.confirmed:
+                return
+            
+            track.latest = (student_id, confidence)
+            track.votes.append((student_id, confidence))
+            if len(track.votes) < self.vote_frames:
+                return
+            
+            winner, _ = Counter(label for label, _ in track.votes).most_common(1)[0]
+            distances = [distance for label, distance in track.votes if label == winner]
+            track.identity = (winner, sum(distances) / len(distances))
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import threading
+from attendance_db import DB_PATH
+from lbph_model import predict_faces
+
+def file_version(*paths):
+    """Version function over files: their modification times and sizes"""
+    def version():
+        stamps = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+    return version
+
+class DatabaseVersion:
+    """Version function over the SQLite store that changes with every commit
+    
+    PRAGMA data_version changes when any other connection commits, so a
+    rename in the students table is seen even though WAL mode leaves the
+    database file itself untouched until a checkpoint.
+    """
+    
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.conn = None
+    
+    def __call__(self):
+        if self.conn is None:
+            # Created by start() but polled from the reloader thread
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+class Reloader:
+    """Keeps the newest version of something loaded from disk, reloading it in the background
+    
+    A thread checks version() every interval seconds. Once a new version
+    has stayed the same for two checks, so a writer has finished, load() is
+    run in that thread and its result replaces `value` in one assignment.
+    Readers therefore see either the old or the new value, never a mix.
+    If load() fails or returns None the old value stays in use. A replaced
+    value with a close() method is closed one check later, once readers
+    have moved on, and the last value is closed by stop().
+    """
+    
+    def __init__(self, name, load, version, interval=2.0):
+        self.name = name
+        self.load = load
+        self.version = version
+        self.interval = interval
+        self.value = None
+        self.reloads = 0
+        self.loaded_version = None
+        self.seen_version = None
+        self.retired = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"reload-{name}", daemon=True)
+    
+    def start(self, value):
+        """Start watching, with value as loaded from the current version"""
+        self.value = value
+        self.loaded_version = self.seen_version = self.version()
+        self.thread.start()
+    
+    def check(self):
+        """Reload if the version changed and has settled; returns whether it reloaded"""
+        self._close_retired()
+        current = self.version()
+        if current == self.loaded_version:
+            self.seen_version = current
+            return False
+        if current != self.seen_version:
+            self.seen_version = current
+            return False
+        
+        try:
+            value = self.load()
+        except Exception as e:
+            print(f"⚠️ Warning: Could not reload {self.name}: {e}")
+            value = None
+        
+        # On failure the same version is retried only once it changes again
+        self.loaded_version = current
+        if value is None:
+            return False
+        self.retired.append(self.value)
+        self.value = value
+        self.reloads += 1
+        print(f"🔄 Reloaded {self.name}")
+        return True
+    
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ Warning: Could not check {self.name} for changes: {e}")
+    
+    def _close_retired(self):
+        while self.retired:
+            value = self.retired.pop()
+            if hasattr(value, "close"):
+                try:
+                    value.close()
+                except Exception as e:
+                    print(f"⚠️ Warning: Could not close the old {self.name}: {e}")
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.retired.append(self.value)
+        self._close_retired()
+
+class HotRecognizer:
+    """Recognizer that predicts with whichever model the reloader holds
+    
+    The model is looked up once per predict_batch() call, so a swap takes
+    effect between frames and never within one.
+    """
+    
+    def __init__(self, reloader):
+        self.reloader = reloader
+    
+    def predict(self, face):
+        return self.predict_batch([face])[0]
+    
+    def predict_batch(self, faces):
+        return predict_faces(self.reloader.value, faces)
+
+class HotStudents:
+    """Student ID to name lookup backed by the reloader's current dict"""
+    
+    def __init__(self, reloader):
+        self.reloader = reloader
+    
+    def get(self, student_id, default=None):
+        return self.reloader.value.get(student_id, default)
+    
+    def __len__(self):
+        return len(self.reloader.value)
+    
+    def __contains__(self, student_id):
+        return student_id in self.reloader.value
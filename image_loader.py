@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+FACE_SIZE = (200, 200)
+CHUNK_SIZE = 2000
+
+def parse_student_id(filename):
+    """Extract student ID from a training image name (format: name.id.sample.jpg)"""
+    return int(os.path.basename(filename).split(".")[1])
+
+def normalize_face(face, size=FACE_SIZE):
+    """Resize a grayscale face crop to the fixed training size"""
+    if face.shape[1] == size[0] and face.shape[0] == size[1]:
+        return face
+    return cv2.resize(face, size, interpolation=cv2.INTER_AREA)
+
+def read_face(image_path, size=FACE_SIZE):
+    """Decode one training image as a normalized grayscale face"""
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError("could not decode image")
+    return normalize_face(image, size)
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class LoaderStats:
+    """Throughput and memory figures of a loading run"""
+    
+    def __init__(self):
+        self.loaded = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+    
+    @property
+    def images_per_second(self):
+        return self.loaded / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def report(self):
+        """Print a one-line summary of the loading run"""
+        peak = peak_rss_mb()
+        memory = f", peak memory {peak:.0f} MB" if peak is not None else ""
+        print(f"⚡ Loaded {self.loaded} images in {self.elapsed:.1f}s "
+              f"({self.images_per_second:.0f} images/sec{memory})")
+        if self.failed:
+            print(f"⚠️ Warning: {self.failed} images could not be processed")
+
+def _load_one(image_path, size):
+    try:
+        return read_face(image_path, size), parse_student_id(image_path)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not process {image_path}: {e}")
+        return None
+
+def iter_face_chunks(image_paths, chunk_size=CHUNK_SIZE, workers=None, size=FACE_SIZE, stats=None,
+                     with_paths=False):
+    """Decode images in a thread pool and yield (faces, ids) chunks of bounded size
+    
+    The next chunk is decoded while the caller consumes the current one, so at
+    most two chunks of faces are held in memory at any time. With with_paths
+    the source path of every face is yielded as a third element.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [image_paths[i:i + chunk_size] for i in range(0, len(image_paths), chunk_size)]
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(chunk):
+            return [executor.submit(_load_one, path, size) for path in chunk]
+        
+        pending = submit(chunks[0]) if chunks else []
+        for index in range(len(chunks)):
+            current = pending
+            pending = submit(chunks[index + 1]) if index + 1 < len(chunks) else []
+            
+            faces = []
+            ids = []
+            paths = []
+            for path, future in zip(chunks[index], current):
+                result = future.result()
+                if result is None:
+                    if stats is not None:
+                        stats.failed += 1
+                    continue
+                faces.append(result[0])
+                ids.append(result[1])
+                paths.append(path)
+            
+            if stats is not None:
+                stats.loaded += len(faces)
+            if faces:
+                ids = np.array(ids, dtype=np.int32)
+                yield (faces, ids, paths) if with_paths else (faces, ids)
+
+def load_faces(image_paths, workers=None, size=FACE_SIZE):
+    """Load every image into memory; prefer iter_face_chunks for large sets"""
+    faces = []
+    ids = []
+    for chunk_faces, chunk_ids in iter_face_chunks(image_paths, workers=workers, size=size):
+        faces.extend(chunk_faces)
+        ids.extend(int(student_id) for student_id in chunk_ids)
+    return faces, ids
@@ -0,0 +1,426 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import cv2
+import numpy as np
+
+MODEL_PATH = "trainer.yml"
+FAST_MODEL_PATH = "trainer_model"
+HISTOGRAMS_FILE = "histograms.npy"
+LABELS_FILE = "labels.npy"
+CENTROIDS_FILE = "centroids.npy"
+CENTROID_LABELS_FILE = "centroid_labels.npy"
+PARAMS_FILE = "params.json"
+MATCH_CHUNK_ROWS = 1024
+
+def lbp_image(src, radius=1, neighbors=8):
+    """Extended (circular) LBP codes of a grayscale image, as computed by OpenCV's LBPH
+    
+    Also accepts a (faces, height, width) stack of equally sized images.
+    """
+    src = np.asarray(src, dtype=np.uint8)
+    rows, cols = src.shape[-2:]
+    center = src[..., radius:rows - radius, radius:cols - radius]
+    codes = np.zeros(center.shape, dtype=np.int32)
+    eps = np.finfo(np.float32).eps
+    
+    for n in range(neighbors):
+        # Same float32 sample points and bilinear weights as OpenCV
+        x = np.float32(radius * np.cos(2.0 * np.pi * n / float(neighbors)))
+        y = np.float32(-radius * np.sin(2.0 * np.pi * n / float(neighbors)))
+        fx, fy = int(np.floor(x)), int(np.floor(y))
+        cx, cy = int(np.ceil(x)), int(np.ceil(y))
+        ty = np.float32(y - fy)
+        tx = np.float32(x - fx)
+        w1 = np.float32((1 - tx) * (1 - ty))
+        w2 = np.float32(tx * (1 - ty))
+        w3 = np.float32((1 - tx) * ty)
+        w4 = np.float32(tx * ty)
+        
+        def shifted(dy, dx):
+            return src[..., radius + dy:rows - radius + dy, radius + dx:cols - radius + dx]
+        
+        t = (w1 * shifted(fy, fx) + w2 * shifted(fy, cx)) + w3 * shifted(cy, fx)
+        t = t + w4 * shifted(cy, cx)
+        bit = (t > center) | (np.abs(t - center) < eps)
+        codes += bit.astype(np.int32) << n
+    
+    return codes
+
+def spatial_histogram(codes, num_patterns=256, grid_x=8, grid_y=8):
+    """Concatenated, per-cell normalized histograms of LBP codes (one LBPH feature row)
+    
+    A (faces, height, width) stack of codes gives one row per face.
+    """
+    batch = codes.ndim == 3
+    codes = codes if batch else codes[np.newaxis]
+    faces = codes.shape[0]
+    height = codes.shape[1] // grid_y
+    width = codes.shape[2] // grid_x
+    features = grid_y * grid_x * num_patterns
+    if height == 0 or width == 0:
+        result = np.zeros((faces, features), dtype=np.float32)
+        return result if batch else result[0]
+    
+    cells = codes[:, :grid_y * height, :grid_x * width].reshape(faces, grid_y, height, grid_x, width)
+    cell_index = np.arange(faces * grid_y * grid_x, dtype=np.int64).reshape(faces, grid_y, 1, grid_x, 1)
+    counts = np.bincount((cell_index * num_patterns + cells).ravel(), minlength=faces * features)
+    result = (counts * (1.0 / (height * width))).astype(np.float32).reshape(faces, features)
+    return result if batch else result[0]
+
+def chi_square_batch(histograms, queries, row_sums=None):
+    """(queries, rows) matrix of LBPH distances between histogram rows and queries
+    
+    Uses (h - q)^2 / (h + q) = h + q - 4hq / (h + q), so only the columns
+    where a query is non-zero have to be read; the rest of each row only
+    contributes its precomputed sum.
+    """
+    if row_sums is None:
+        row_sums = histograms.sum(axis=1, dtype=np.float64)
+    
+    distances = np.empty((len(queries), len(histograms)), dtype=np.float64)
+    for index, query in enumerate(queries):
+        columns = np.flatnonzero(query)
+        values = query[columns]
+        # np.take gathers columns several times faster than fancy indexing
+        rows = np.take(histograms, columns, axis=1)
+        overlap = rows * values
+        overlap /= rows + values
+        distances[index] = 2.0 * (row_sums + query.sum(dtype=np.float64) - 4.0 * overlap.sum(axis=1))
+    
+    # Cancellation can leave tiny negative values for identical histograms
+    return np.maximum(distances, 0.0, out=distances)
+
+class LBPHModel:
+    """LBPH recognizer backed by a contiguous (possibly memory-mapped) histogram matrix
+    
+    predict() follows the cv2.face LBPHFaceRecognizer contract, returning
+    (label, distance) with label -1 if nothing is closer than the threshold.
+    predict_batch() scores all faces of a frame in a single pass over the
+    matrix. With top_k set, faces are first compared against one mean
+    histogram per student and only the samples of the top_k closest
+    students are scanned, so cost no longer grows with samples per student.
+    """
+    
+    def __init__(self, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8,
+                 threshold=float(np.finfo(np.float64).max), centroids=None, centroid_labels=None,
+                 top_k=None):
+        self.histograms = histograms
+        self.labels = labels
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.threshold = threshold
+        self.centroids = centroids
+        self.centroid_labels = centroid_labels
+        self.top_k = top_k
+        self._row_sums = None
+    
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        """Copy the histograms out of a cv2 LBPH recognizer"""
+        histograms = recognizer.getHistograms()
+        labels = recognizer.getLabels()
+        return cls(
+            np.vstack(histograms).astype(np.float32) if histograms else np.zeros((0, 0), dtype=np.float32),
+            labels.ravel().astype(np.int32) if labels is not None else np.zeros(0, dtype=np.int32),
+            **params_of(recognizer),
+        )
+    
+    def params(self):
+        return {
+            "radius": self.radius,
+            "neighbors": self.neighbors,
+            "grid_x": self.grid_x,
+            "grid_y": self.grid_y,
+            "threshold": self.threshold,
+        }
+    
+    def histogram(self, face):
+        """LBPH feature row of one grayscale face"""
+        codes = lbp_image(face, self.radius, self.neighbors)
+        return spatial_histogram(codes, 2 ** self.neighbors, self.grid_x, self.grid_y)
+    
+    def histograms_of(self, faces):
+        """(faces, features) matrix of LBPH feature rows, batching equally sized faces"""
+        queries = np.empty((len(faces), self.histograms.shape[1]), dtype=np.float32)
+        by_shape = {}
+        for index, face in enumerate(faces):
+            by_shape.setdefault(face.shape, []).append(index)
+        
+        for indices in by_shape.values():
+            codes = lbp_image(np.stack([faces[index] for index in indices]), self.radius, self.neighbors)
+            queries[indices] = spatial_histogram(codes, 2 ** self.neighbors, self.grid_x, self.grid_y)
+        return queries
+    
+    @property
+    def row_sums(self):
+        """Sum of every histogram row, computed on first use"""
+        if self._row_sums is None:
+            self._row_sums = np.concatenate([
+                self.histograms[start:start + MATCH_CHUNK_ROWS].sum(axis=1, dtype=np.float64)
+                for start in range(0, len(self.labels), MATCH_CHUNK_ROWS)
+            ] or [np.zeros(0)])
+        return self._row_sums
+    
+    def ensure_centroids(self):
+        """Compute per-student mean histograms if the model file did not include them"""
+        if self.centroids is None:
+            self.centroid_labels, self.centroids = student_centroids(self.histograms, self.labels)
+        return self.centroids
+    
+    def predict(self, face):
+        """Return (label, distance) of the closest training histogram"""
+        return self.predict_batch([face])[0]
+    
+    def predict_batch(self, faces):
+        """Return a (label, distance) pair per face"""
+        if not len(faces):
+            return []
+        if not len(self.labels):
+            return [(-1, float(np.finfo(np.float64).max))] * len(faces)
+        
+        labels, distances = self.match(self.histograms_of(faces))
+        
+        results = []
+        for label, distance in zip(labels, distances):
+            if distance < self.threshold:
+                results.append((int(label), float(distance)))
+            else:
+                results.append((-1, float(np.finfo(np.float64).max)))
+        return results
+    
+    def match(self, queries):
+        """Closest label and distance per feature row, before the threshold is applied"""
+        if self.top_k and len(self.labels):
+            return self._match_prefiltered(queries)
+        return self._match_all(queries)
+    
+    def _match_all(self, queries):
+        best_labels = np.full(len(queries), -1, dtype=np.int64)
+        best_distances = np.full(len(queries), np.inf)
+        row_sums = self.row_sums
+        
+        for start in range(0, len(self.labels), MATCH_CHUNK_ROWS):
+            chunk = slice(start, start + MATCH_CHUNK_ROWS)
+            distances = chi_square_batch(self.histograms[chunk], queries, row_sums[chunk])
+            index = distances.argmin(axis=1)
+            chunk_best = distances[np.arange(len(queries)), index]
+            better = chunk_best < best_distances
+            best_distances[better] = chunk_best[better]
+            best_labels[better] = self.labels[start + index[better]]
+        
+        return best_labels, best_distances
+    
+    def _match_prefiltered(self, queries):
+        centroids = self.ensure_centroids()
+        top_k = min(self.top_k, len(self.centroid_labels))
+        coarse = chi_square_batch(centroids, queries)
+        candidates = np.argpartition(coarse, top_k - 1, axis=1)[:, :top_k]
+        
+        best_labels = np.full(len(queries), -1, dtype=np.int64)
+        best_distances = np.full(len(queries), np.inf)
+        for index, query in enumerate(queries):
+            rows = np.flatnonzero(np.isin(self.labels, self.centroid_labels[candidates[index]]))
+            distances = chi_square_batch(self.histograms[rows], query[np.newaxis], self.row_sums[rows])[0]
+            best = int(distances.argmin())
+            best_labels[index] = self.labels[rows[best]]
+            best_distances[index] = distances[best]
+        
+        return best_labels, best_distances
+
+def student_centroids(histograms, labels):
+    """Return (student labels, mean histogram per student)"""
+    student_labels, inverse = np.unique(labels, return_inverse=True)
+    sums = np.zeros((len(student_labels), histograms.shape[1]), dtype=np.float64)
+    for start in range(0, len(labels), MATCH_CHUNK_ROWS):
+        chunk = np.asarray(histograms[start:start + MATCH_CHUNK_ROWS])
+        chunk_inverse = inverse[start:start + MATCH_CHUNK_ROWS]
+        # Samples are stored grouped by student, so a chunk spans few students
+        for student in np.unique(chunk_inverse):
+            sums[student] += chunk[chunk_inverse == student].sum(axis=0, dtype=np.float64)
+    counts = np.bincount(inverse, minlength=len(student_labels))[:, np.newaxis]
+    return student_labels.astype(np.int32), (sums / np.maximum(counts, 1)).astype(np.float32)
+
+def predict_faces(recognizer, faces):
+    """Predict a list of faces with a cv2 recognizer or an LBPHModel"""
+    if hasattr(recognizer, "predict_batch"):
+        return recognizer.predict_batch(faces)
+    return [recognizer.predict(face) for face in faces]
+
+def params_of(recognizer):
+    """LBPH parameters of a cv2 recognizer"""
+    return {
+        "radius": recognizer.getRadius(),
+        "neighbors": recognizer.getNeighbors(),
+        "grid_x": recognizer.getGridX(),
+        "grid_y": recognizer.getGridY(),
+        "threshold": recognizer.getThreshold(),
+    }
+
+def save_recognizer(recognizer, path=MODEL_PATH):
+    """Save a cv2 recognizer so readers never see a partially written file"""
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    recognizer.save(tmp_path)
+    os.replace(tmp_path, path)
+
+def replace_directory(tmp_path, path):
+    """Move a completely written directory to path, replacing the old one
+    
+    A non-empty directory cannot be renamed over, so the old one is moved
+    aside first; path is only missing between the two renames. Processes
+    that memory-mapped the old files keep reading them until they reload.
+    """
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def save_fast_model(recognizer, path=FAST_MODEL_PATH):
+    """Write a cv2 LBPH recognizer as raw .npy histogram and label arrays
+    
+    The arrays are written to a temporary directory that then replaces
+    path, so a reader never loads a mix of old and new files.
+    """
+    histograms = recognizer.getHistograms()
+    labels = recognizer.getLabels()
+    labels = labels.ravel() if labels is not None else np.zeros(0, dtype=np.int32)
+    width = histograms[0].size if histograms else 0
+    
+    final_path = path
+    path = final_path + ".tmp"
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    
+    # Fill the matrix row by row so the histograms are never held twice
+    matrix = np.lib.format.open_memmap(os.path.join(path, HISTOGRAMS_FILE), mode='w+',
+                                       dtype=np.float32, shape=(len(histograms), width))
+    for row, histogram in enumerate(histograms):
+        matrix[row] = histogram.ravel()
+    matrix.flush()
+    del matrix
+    
+    np.save(os.path.join(path, LABELS_FILE), labels.astype(np.int32))
+    
+    matrix = np.load(os.path.join(path, HISTOGRAMS_FILE), mmap_mode='r')
+    centroid_labels, centroids = student_centroids(matrix, labels)
+    del matrix
+    np.save(os.path.join(path, CENTROIDS_FILE), centroids)
+    np.save(os.path.join(path, CENTROID_LABELS_FILE), centroid_labels)
+    
+    with open(os.path.join(path, PARAMS_FILE), 'w') as f:
+        json.dump(params_of(recognizer), f)
+    
+    replace_directory(path, final_path)
+
+def load_fast_model(path=FAST_MODEL_PATH, top_k=None):
+    """Open a fast model; histograms are memory-mapped and paged in on first use"""
+    with open(os.path.join(path, PARAMS_FILE)) as f:
+        params = json.load(f)
+    
+    histograms = np.load(os.path.join(path, HISTOGRAMS_FILE), mmap_mode='r')
+    labels = np.load(os.path.join(path, LABELS_FILE))
+    
+    centroids = centroid_labels = None
+    if os.path.exists(os.path.join(path, CENTROIDS_FILE)):
+        centroids = np.load(os.path.join(path, CENTROIDS_FILE), mmap_mode='r')
+        centroid_labels = np.load(os.path.join(path, CENTROID_LABELS_FILE))
+    
+    return LBPHModel(histograms, labels, centroids=centroids, centroid_labels=centroid_labels,
+                     top_k=top_k, **params)
+
+def fast_model_is_current(model_path=MODEL_PATH, fast_path=FAST_MODEL_PATH):
+    """Whether the fast model exists and is not older than the YAML model"""
+    params_path = os.path.join(fast_path, PARAMS_FILE)
+    if not os.path.exists(params_path):
+        return False
+    if not os.path.exists(model_path):
+        return True
+    return os.path.getmtime(params_path) >= os.path.getmtime(model_path)
+
+def load_recognizer(model_path=MODEL_PATH, fast_path=FAST_MODEL_PATH, top_k=None):
+    """Load the trained model, preferring the fast format when it is up to date"""
+    if fast_model_is_current(model_path, fast_path):
+        print("⚡ Loading fast model format")
+        return load_fast_model(fast_path, top_k=top_k)
+    
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+    return recognizer
+
+def convert_model(model_path=MODEL_PATH, fast_path=FAST_MODEL_PATH):
+    """Convert an existing trainer.yml to the fast model format"""
+    try:
+        if not os.path.exists(model_path):
+            print(f"❌ Error: {model_path} not found. Please train the model first.")
+            return
+        
+        print(f"🔄 Converting {model_path}...")
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(model_path)
+        save_fast_model(recognizer, fast_path)
+        print(f"✅ Fast model saved as: {fast_path}")
+        
+    except Exception as e:
+        print(f"❌ Error converting model: {e}")
+
+def directory_size(path):
+    """Total size in bytes of the files in a directory"""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def benchmark_load(model_path=MODEL_PATH, fast_path=FAST_MODEL_PATH):
+    """Compare load time and size of the YAML and fast model formats"""
+    try:
+        if not os.path.exists(model_path) or not os.path.exists(fast_path):
+            print("❌ Error: Both trainer.yml and the fast model are needed for the benchmark")
+            return None
+        
+        start = time.perf_counter()
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(model_path)
+        yaml_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        model = load_fast_model(fast_path)
+        fast_seconds = time.perf_counter() - start
+        
+        # Touching every page shows the cost once the whole model is resident
+        start = time.perf_counter()
+        float(np.asarray(model.histograms).sum())
+        fast_resident_seconds = fast_seconds + time.perf_counter() - start
+        
+        results = {
+            "samples": len(model.labels),
+            "yaml_bytes": os.path.getsize(model_path),
+            "fast_bytes": directory_size(fast_path),
+            "yaml_load_seconds": yaml_seconds,
+            "fast_load_seconds": fast_seconds,
+            "fast_resident_seconds": fast_resident_seconds,
+        }
+        
+        print(f"📊 Model load benchmark ({results['samples']} samples)")
+        print("-" * 40)
+        print(f"YAML: {results['yaml_bytes'] / 1e6:.1f} MB, loaded in {yaml_seconds:.3f}s")
+        print(f"Fast: {results['fast_bytes'] / 1e6:.1f} MB, opened in {fast_seconds:.3f}s "
+              f"({fast_resident_seconds:.3f}s fully paged in)")
+        return results
+        
+    except Exception as e:
+        print(f"❌ Error during benchmark: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fast LBPH model format tools")
+    parser.add_argument("command", choices=["convert", "benchmark"])
+    args = parser.parse_args()
+    
+    if args.command == "convert":
+        convert_model()
+    else:
+        benchmark_load()
@@ -10,6 +10,7 @@ from capture_image import take_images
 from train_model import train_model
 from recognize_attendance import recognize_attendance
 from camera_test import test_camera
+from system_status import print_status, system_status
 
 def print_banner():
     """Print application banner"""
@@ -34,50 +35,7 @@ def print_menu():
 
 def check_system_status():
     """Check and display system status"""
-    print("\n🔍 SYSTEM STATUS CHECK")
-    print("-" * 40)
-    
-    # Check required files
-    required_files = [
-        ("haarcascade_frontalface_default.xml", "Face detection model"),
-        ("trainer.yml", "Trained recognition model")
-    ]
-    
-    for filename, description in required_files:
-        status = "✅ Found" if os.path.exists(filename) else "❌ Missing"
-        print(f"{description}: {status}")
-    
-    # Check directories
-    required_dirs = [
-        ("TrainingImage", "Training images storage"),
-        ("StudentDetails", "Student database"),
-        ("Attendance", "Attendance records")
-    ]
-    
-    for dirname, description in required_dirs:
-        if os.path.exists(dirname):
-            count = len([f for f in os.listdir(dirname) if os.path.isfile(os.path.join(dirname, f))])
-            print(f"{description}: ✅ Found ({count} files)")
-        else:
-            print(f"{description}: ❌ Missing")
-    
-    # Training images analysis
-    if os.path.exists("TrainingImage"):
-        images = [f for f in os.listdir("TrainingImage") if f.endswith('.jpg')]
-        if images:
-            # Count unique students
-            unique_ids = set()
-            for img in images:
-                try:
-                    student_id = img.split('.')[1]
-                    unique_ids.add(student_id)
-                except:
-                    pass
-            print(f"📊 Training data: {len(images)} images from {len(unique_ids)} students")
-        else:
-            print("📊 Training data: No images found")
-    
-    print("-" * 40)
+    print_status(system_status())
 
 def setup_directories():
     """Create necessary directories"""
@@ -105,7 +63,7 @@ def main():
                 print("   • Ensure good lighting")
                 print("   • Look directly at camera")
                 print("   • Keep face centered in frame")
-                print("   • System will capture 100 images automatically")
+                print("   • Turn your head slightly; only sharp, varied images are kept")
                 print()
                 take_images()
                 
@@ -113,11 +71,11 @@ def main():
                 print("\n🤖 TRAIN RECOGNITION MODEL")
                 print("-" * 30)
                 print("💡 This process will:")
-                print("   • Analyze all captured face images")
-                print("   • Create AI recognition model")
+                print("   • Analyze new or changed face images")
+                print("   • Update the AI recognition model")
                 print("   • Save trained model for attendance")
                 print()
-                train_model()
+                train_model(incremental=True)
                 
             elif choice == '3':
                 print("\n📋 TAKE ATTENDANCE")
@@ -0,0 +1,154 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+import cv2
+from attendance_log import AttendanceLog
+from face_detection import DetectionScheduler, create_detector
+from face_tracker import FaceTracker
+from lbph_model import convert_model, fast_model_is_current, load_recognizer
+from recognize_attendance import AttendanceSession, load_student_data, lookup_name, recognize_stream, report_attendance, store_session
+
+STATS_INTERVAL = 5.0
+
+def parse_source(source):
+    """Camera index for numeric sources, otherwise a video file path or stream URL"""
+    return int(source) if source.isdigit() else source
+
+def camera_worker(camera, source, events, stop, stride=1):
+    """Recognize faces from one source and send events to the server process"""
+    # One OpenCV thread per camera process; the server scales with processes
+    cv2.setNumThreads(1)
+    
+    try:
+        cam = cv2.VideoCapture(parse_source(source))
+        if not cam.isOpened():
+            events.put(("error", camera, f"Could not open source {source}"))
+            return
+        
+        # The fast model is memory-mapped, so every camera process shares
+        # the same page-cache copy of the histograms
+        recognizer = load_recognizer()
+        detector = create_detector(scale_factor=1.2, min_neighbors=5)
+        if detector is None:
+            events.put(("error", camera, "Face detector model not found"))
+            cam.release()
+            return
+        scheduler = DetectionScheduler(detector, min_size=(64, 48))
+        tracker = FaceTracker()
+        
+        start = last_report = time.perf_counter()
+        frames = 0
+        for _, present in recognize_stream(cam, scheduler, recognizer, tracker, stride):
+            frames += 1
+            for student_id, confidence_score in present:
+                events.put(("present", camera, student_id, confidence_score, time.time()))
+            
+            now = time.perf_counter()
+            if now - last_report >= STATS_INTERVAL:
+                events.put(("stats", camera, frames, now - start))
+                last_report = now
+            if stop.is_set():
+                break
+        
+        cam.release()
+        events.put(("stats", camera, frames, time.perf_counter() - start))
+    
+    except Exception as e:
+        events.put(("error", camera, str(e)))
+    finally:
+        events.put(("done", camera))
+
+def run_server(sources, stride=1):
+    """Run one recognition process per source and merge their attendance events"""
+    attendance_log = None
+    try:
+        if not os.path.exists("trainer.yml"):
+            print("❌ Error: trainer.yml not found. Please train the model first.")
+            return None
+        
+        # Convert once here so the workers all map the same fast model files
+        if not fast_model_is_current():
+            convert_model()
+        
+        students = load_student_data()
+        if students is None:
+            return None
+        
+        attendance_log = AttendanceLog()
+        attendance_log.start()
+        attendance = AttendanceSession(attendance_log)
+        events = mp.Queue()
+        stop = mp.Event()
+        workers = [
+            mp.Process(target=camera_worker, args=(camera, source, events, stop, stride), daemon=True)
+            for camera, source in enumerate(sources)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        print(f"🎥 Attendance server running on {len(sources)} sources (Ctrl+C to stop)")
+        fps = {}
+        running = len(workers)
+        
+        try:
+            while running:
+                try:
+                    event = events.get(timeout=1.0)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        break
+                    continue
+                
+                kind, camera = event[0], event[1]
+                if kind == "present":
+                    student_id, confidence_score = event[2], event[3]
+                    name = lookup_name(students, student_id)
+                    if student_id not in attendance:
+                        print(f"📷 Camera {camera} ({sources[camera]}): {name} at {confidence_score}%")
+                    attendance.add(student_id, name)
+                elif kind == "stats":
+                    fps[camera] = event[2] / event[3] if event[3] > 0 else 0.0
+                    print(f"📈 Camera {camera} ({sources[camera]}): {fps[camera]:.1f} FPS over {event[2]} frames")
+                elif kind == "error":
+                    print(f"❌ Camera {camera} ({sources[camera]}): {event[2]}")
+                elif kind == "done":
+                    running -= 1
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping cameras...")
+        
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=5.0)
+        
+        print("\n📊 Per-camera throughput")
+        print("-" * 40)
+        for camera, source in enumerate(sources):
+            print(f"Camera {camera} ({source}): {fps.get(camera, 0.0):.1f} FPS")
+        
+        filepath = attendance_log.close(attendance.records)
+        if filepath:
+            store_session(filepath, attendance.records)
+            report_attendance(attendance.to_dataframe(), filepath)
+        else:
+            print("📝 No attendance recorded")
+        return attendance.to_dataframe()
+    
+    except Exception as e:
+        print(f"❌ Error in attendance server: {e}")
+        return None
+    
+    finally:
+        if attendance_log is not None:
+            filepath = attendance_log.close()
+            if filepath:
+                store_session(filepath, attendance_log.rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless attendance from several cameras")
+    parser.add_argument("sources", nargs="+", help="camera indices, video files or stream URLs")
+    parser.add_argument("--stride", type=int, default=1, help="process every n-th frame")
+    args = parser.parse_args()
+    
+    run_server(args.sources, args.stride)
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import cv2
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def percentile(values, q):
+    """q-th quantile of an already sorted list"""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+class StageStats:
+    """Rolling per-stage latencies, dropped frames and end-to-end frame rate"""
+    
+    def __init__(self, window=300):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.totals = {}
+        self.dropped = {}
+        self.rendered = deque(maxlen=window)
+        self.lock = threading.Lock()
+    
+    def add(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+    
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+    
+    def drop(self, stage):
+        with self.lock:
+            self.dropped[stage] = self.dropped.get(stage, 0) + 1
+    
+    def frame_done(self, captured_at):
+        now = time.perf_counter()
+        self.add("end_to_end", now - captured_at)
+        with self.lock:
+            self.rendered.append(now)
+    
+    @property
+    def fps(self):
+        with self.lock:
+            if len(self.rendered) < 2:
+                return 0.0
+            return (len(self.rendered) - 1) / (self.rendered[-1] - self.rendered[0])
+    
+    def summary(self):
+        """Mean and p50/p95/p99 latency in milliseconds per stage over the window"""
+        with self.lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+        
+        summary = {}
+        for stage, values in samples.items():
+            if values:
+                summary[stage] = {"mean_ms": 1000 * sum(values) / len(values)}
+                for q in QUANTILES:
+                    summary[stage][f"p{int(q * 100)}_ms"] = 1000 * percentile(values, q)
+        return summary
+    
+    def report(self):
+        """Print per-stage latency, drops and frame rate"""
+        print("\n⏱️ Pipeline performance")
+        print("-" * 40)
+        for stage, values in self.summary().items():
+            print(f"{stage:>12}: {values['mean_ms']:.1f} ms mean, {values['p95_ms']:.1f} ms p95")
+        for stage, count in self.dropped.items():
+            print(f"{stage:>12}: {count} frames dropped")
+        print(f"{'fps':>12}: {self.fps:.1f}")
+
+class NullStats:
+    """Stand-in for StageStats when instrumentation is off; every call is a no-op"""
+    
+    _context = nullcontext()
+    fps = 0.0
+    
+    def add(self, stage, seconds):
+        pass
+    
+    def time(self, stage):
+        return self._context
+    
+    def drop(self, stage):
+        pass
+    
+    def frame_done(self, captured_at):
+        pass
+    
+    def summary(self):
+        return {}
+    
+    def report(self):
+        pass
+
+def draw_overlay(frame, stats, origin=(10, 60)):
+    """Draw FPS and per-stage p95 latency onto a frame"""
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    x, y = origin
+    cv2.putText(frame, f"FPS: {stats.fps:.1f}", (x, y), font, 0.5, (255, 255, 0), 1)
+    for stage, values in stats.summary().items():
+        y += 18
+        cv2.putText(frame, f"{stage}: {values['p95_ms']:.1f} ms p95", (x, y), font, 0.5, (255, 255, 0), 1)
+
+def prometheus_text(stats, prefix):
+    """Stage statistics in the Prometheus text exposition format"""
+    summary = stats.summary()
+    lines = [
+        f"# HELP {prefix}_stage_latency_seconds Rolling latency of each processing stage",
+        f"# TYPE {prefix}_stage_latency_seconds summary",
+    ]
+    with stats.lock:
+        counts = dict(stats.counts)
+        totals = dict(stats.totals)
+        dropped = dict(stats.dropped)
+    
+    for stage, values in summary.items():
+        for q in QUANTILES:
+            seconds = values[f"p{int(q * 100)}_ms"] / 1000
+            lines.append(f'{prefix}_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {seconds:.6f}')
+        lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {totals.get(stage, 0.0):.6f}')
+        lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {counts.get(stage, 0)}')
+    
+    lines += [
+        f"# HELP {prefix}_frames_dropped_total Frames dropped per stage",
+        f"# TYPE {prefix}_frames_dropped_total counter",
+    ]
+    lines += [f'{prefix}_frames_dropped_total{{stage="{stage}"}} {count}' for stage, count in dropped.items()]
+    lines += [
+        f"# HELP {prefix}_fps Frames shown per second",
+        f"# TYPE {prefix}_fps gauge",
+        f"{prefix}_fps {stats.fps:.2f}",
+    ]
+    return "\n".join(lines) + "\n"
+
+class MetricsConfig:
+    """Whether to time the stages of a camera loop, and where to show the results
+    
+    Timing is off unless enabled, overlay or metrics_path is set. The overlay
+    draws FPS and latency on every frame; with metrics_path the statistics
+    are rewritten in Prometheus text format every interval seconds.
+    """
+    
+    def __init__(self, enabled=False, overlay=False, metrics_path=None, interval=10.0):
+        self.enabled = enabled or overlay or metrics_path is not None
+        self.overlay = overlay
+        self.metrics_path = metrics_path
+        self.interval = interval
+
+class Instrumentation:
+    """Stage timers of one camera loop plus its overlay and metrics file"""
+    
+    def __init__(self, prefix, config=None, stats=None):
+        self.prefix = prefix
+        self.config = config or MetricsConfig()
+        if stats is None:
+            stats = StageStats() if self.config.enabled else NullStats()
+        self.stats = stats
+        self.last_write = time.monotonic()
+    
+    def time(self, stage):
+        return self.stats.time(stage)
+    
+    def annotate(self, frame):
+        """Draw the overlay, if enabled, before the frame is shown"""
+        if self.config.overlay:
+            draw_overlay(frame, self.stats)
+    
+    def frame_done(self, captured_at):
+        self.stats.frame_done(captured_at)
+        if self.config.metrics_path and time.monotonic() - self.last_write >= self.config.interval:
+            self.write_metrics()
+    
+    def write_metrics(self):
+        """Replace the metrics file with the current statistics"""
+        try:
+            tmp_path = self.config.metrics_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(prometheus_text(self.stats, self.prefix))
+            os.replace(tmp_path, self.config.metrics_path)
+        except Exception as e:
+            print(f"⚠️ Warning: Could not write metrics: {e}")
+        self.last_write = time.monotonic()
+    
+    def close(self):
+        """Write the final metrics and print the summary"""
+        if self.config.metrics_path:
+            self.write_metrics()
+        self.stats.report()
@@ -0,0 +1,256 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from attendance_pipeline import FrameResult
+from face_detection import create_detector
+from image_loader import normalize_face
+from lbph_model import predict_faces
+from perf_metrics import StageStats
+
+_END = "end"
+
+class FrameRing:
+    """Fixed-size frames in one shared memory block, handed between processes by slot number
+    
+    The process that creates the ring owns the block and unlinks it on
+    close(); other processes attach() by spec and see the same memory, so
+    a frame written once is read everywhere without copying or pickling.
+    """
+    
+    def __init__(self, shape, slots, dtype=np.uint8, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        size = slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+    
+    @property
+    def spec(self):
+        """What another process needs to attach to this ring"""
+        return self.shm.name, self.shape, self.slots, self.dtype.str
+    
+    @classmethod
+    def attach(cls, spec):
+        name, shape, slots, dtype = spec
+        return cls(shape, slots, dtype, name=name)
+    
+    def close(self):
+        # Views into the buffer must be gone before it can be closed
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def read_into(cam, frame):
+    """Read the next camera frame into a ring slot; returns whether a frame was read"""
+    ret, image = cam.read(frame)
+    if not ret or image is None:
+        return False
+    # OpenCV only decodes in place when the slot already has the frame's size
+    if image.ctypes.data != frame.ctypes.data:
+        if image.shape != frame.shape:
+            image = cv2.resize(image, (frame.shape[1], frame.shape[0]), interpolation=cv2.INTER_AREA)
+        frame[...] = image
+    return True
+
+def capture_process(source, ring_spec, free, tasks, stop, dropped, workers):
+    """Write camera frames into free ring slots and announce them to the workers"""
+    cv2.setNumThreads(1)
+    ring = FrameRing.attach(ring_spec)
+    cam = cv2.VideoCapture(source)
+    try:
+        if not cam.isOpened():
+            print(f"❌ Error: Could not access camera {source}")
+            return
+        
+        height, width = ring.shape[:2]
+        cam.set(3, width)
+        cam.set(4, height)
+        
+        seq = 0
+        while not stop.is_set():
+            try:
+                slot = free.get_nowait()
+            except queue.Empty:
+                # Every slot is still being worked on; keep the camera
+                # current by skipping this frame without decoding it
+                if not cam.grab():
+                    break
+                with dropped.get_lock():
+                    dropped.value += 1
+                time.sleep(0.001)
+                continue
+            
+            captured_at = time.perf_counter()
+            if not read_into(cam, ring.frames[slot]):
+                free.put(slot)
+                break
+            tasks.put((seq, slot, captured_at))
+            seq += 1
+    finally:
+        cam.release()
+        for _ in range(workers):
+            tasks.put(None)
+        ring.close()
+
+def recognition_worker(ring_spec, tasks, results, load_model, model_args, detection_config, min_face=0.1):
+    """Detect and recognize the faces of announced ring slots, sending back only metadata"""
+    # Parallelism comes from the worker processes, not from OpenCV threads
+    cv2.setNumThreads(1)
+    ring = FrameRing.attach(ring_spec)
+    try:
+        recognizer = load_model(*model_args)
+        detector = create_detector(detection_config, 1.2, 5)
+        if recognizer is None or detector is None:
+            results.put((_END, "model or face detector could not be loaded"))
+            return
+        
+        height, width = ring.shape[:2]
+        min_size = (int(min_face * width), int(min_face * height))
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, captured_at = task
+            
+            start = time.perf_counter()
+            gray = cv2.cvtColor(ring.frames[slot], cv2.COLOR_BGR2GRAY)
+            faces = detector.detect(gray, min_size)
+            detected = time.perf_counter()
+            crops = [normalize_face(gray[y:y + h, x:x + w]) for (x, y, w, h) in faces]
+            predictions = predict_faces(recognizer, crops)
+            results.put((seq, slot, captured_at, faces, predictions,
+                         detected - start, time.perf_counter() - detected))
+    except Exception as e:
+        results.put((_END, str(e)))
+        return
+    finally:
+        ring.close()
+    results.put((_END, None))
+
+class ProcessPipeline:
+    """Capture process and recognition worker processes sharing frames through a FrameRing
+    
+    The capture process reads each camera frame straight into a free slot
+    of the ring; workers detect and recognize on that memory and send back
+    only the boxes and predictions. The caller renders on the main process,
+    pulling frames in capture order with next_result() and handing each
+    slot back with release() once it is shown. Frames are never pickled, so the work
+    spreads over all cores without the GIL or serialization in the way.
+    """
+    
+    def __init__(self, source, load_model, model_args=(), detection_config=None, workers=None, slots=None,
+                 shape=(480, 640, 3)):
+        self.source = source
+        self.load_model = load_model
+        self.model_args = model_args
+        self.detection_config = detection_config
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.slots = slots or 2 * self.workers + 2
+        self.shape = shape
+        self.stats = StageStats()
+        self.ring = None
+        self.processes = []
+        self.finished_workers = 0
+        self.reorder = {}
+        self.next_seq = 0
+    
+    def start(self):
+        self.ring = FrameRing(self.shape, self.slots)
+        self.free = mp.Queue()
+        self.tasks = mp.Queue()
+        self.results = mp.Queue()
+        self.stop_event = mp.Event()
+        self.dropped = mp.Value('i', 0)
+        for slot in range(self.slots):
+            self.free.put(slot)
+        
+        self.processes = [mp.Process(
+            target=capture_process,
+            args=(self.source, self.ring.spec, self.free, self.tasks, self.stop_event, self.dropped, self.workers),
+            daemon=True,
+        )]
+        self.processes += [
+            mp.Process(
+                target=recognition_worker,
+                args=(self.ring.spec, self.tasks, self.results, self.load_model, self.model_args,
+                      self.detection_config),
+                daemon=True,
+            )
+            for _ in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+    
+    def next_result(self):
+        """Block until the next frame in capture order is ready; None once the stream has ended
+        
+        Workers finish out of order, so early frames wait in a small reorder
+        buffer instead of being dropped. If a frame is still missing once
+        more than one frame per worker is waiting, it was lost with its
+        worker and is skipped.
+        """
+        while True:
+            message = self.reorder.pop(self.next_seq, None)
+            if message is not None:
+                self.next_seq += 1
+                return self._frame_result(message)
+            
+            ended = self.finished_workers == self.workers
+            if self.reorder and (ended or len(self.reorder) > self.workers):
+                self.stats.drop("render")
+                self.next_seq = min(self.reorder)
+                continue
+            if ended:
+                return None
+            
+            try:
+                message = self.results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self.processes):
+                    self.finished_workers = self.workers
+                continue
+            
+            if message[0] == _END:
+                if message[1]:
+                    print(f"❌ Error in recognition worker: {message[1]}")
+                self.finished_workers += 1
+                continue
+            
+            seq, slot, captured_at, faces, predictions, detect_seconds, recognize_seconds = message
+            self.stats.add("detect", detect_seconds)
+            self.stats.add("recognize", recognize_seconds)
+            if seq < self.next_seq:
+                # Arrived after it was given up on
+                self.free.put(slot)
+            else:
+                self.reorder[seq] = message
+    
+    def _frame_result(self, message):
+        seq, slot, captured_at, faces, predictions, _, _ = message
+        result = FrameResult(seq, captured_at, self.ring.frames[slot])
+        result.slot = slot
+        result.faces = faces
+        result.predictions = predictions
+        return result
+    
+    def release(self, result):
+        """Hand a rendered frame's slot back to the capture process"""
+        self.free.put(result.slot)
+    
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.stats.dropped["grab"] = self.dropped.value
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
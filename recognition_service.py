@@ -0,0 +1,408 @@
+import argparse
+import base64
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+from face_detection import DetectionConfig, create_detector
+from hot_reload import DatabaseVersion, HotRecognizer, HotStudents, Reloader, file_version
+from image_loader import normalize_face
+from lbph_model import predict_faces
+from perf_metrics import percentile
+from recognize_attendance import KNOWN_SCORE, PRESENT_SCORE, load_model, load_student_data, lookup_name, model_files
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+REQUEST_TIMEOUT = 30.0
+
+def decode_jpeg(data):
+    """Decode an encoded image (JPEG, PNG, ...) into a BGR frame; raises ValueError if it is not one"""
+    if not data:
+        raise ValueError("empty image")
+    try:
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        frame = None
+    if frame is None:
+        raise ValueError("could not decode image")
+    return frame
+
+def decode_raw(data, width, height, channels=3):
+    """Split a body of equally sized raw 8-bit frames (BGR or grayscale)"""
+    frame_bytes = width * height * channels
+    if frame_bytes <= 0 or not data or len(data) % frame_bytes:
+        raise ValueError(f"body is not a whole number of {width}x{height}x{channels} frames")
+    shape = (height, width, channels) if channels > 1 else (height, width)
+    frames = np.frombuffer(data, dtype=np.uint8).reshape((-1,) + shape)
+    return list(frames)
+
+class Recognizer:
+    """Detects and recognizes the faces of independent frames
+    
+    The frames of a batch are detected in parallel on a thread pool (OpenCV
+    releases the GIL). make_detector must build an unshared detector, since
+    every thread calls it once for a detector of its own.
+    The crops of every frame are then predicted in a single predict_faces()
+    call, so the model matrix is scanned once per batch instead of once
+    per frame.
+    """
+    
+    def __init__(self, make_detector, recognizer, students, min_face=0.1, workers=None):
+        self.make_detector = make_detector
+        self.recognizer = recognizer
+        self.students = students
+        self.min_face = min_face
+        self.local = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                       thread_name_prefix="detect")
+    
+    def close(self):
+        self.pool.shutdown()
+    
+    def detect(self, frame):
+        """(gray frame, face boxes) of one frame"""
+        detector = getattr(self.local, "detector", None)
+        if detector is None:
+            detector = self.local.detector = self.make_detector()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        height, width = gray.shape
+        min_size = (int(self.min_face * width), int(self.min_face * height))
+        return gray, detector.detect(gray, min_size)
+    
+    def recognize(self, frames):
+        """List of face results per frame"""
+        boxes = []
+        crops = []
+        for gray, faces in self.pool.map(self.detect, frames):
+            boxes.append(faces)
+            crops += [normalize_face(gray[y:y + h, x:x + w]) for (x, y, w, h) in faces]
+        
+        predictions = iter(predict_faces(self.recognizer, crops))
+        results = []
+        for faces in boxes:
+            frame_results = []
+            for (x, y, w, h), (student_id, distance) in zip(faces, predictions):
+                confidence = round(100 - distance, 2)
+                known = confidence > KNOWN_SCORE
+                frame_results.append({
+                    "id": int(student_id) if known else None,
+                    "name": lookup_name(self.students, student_id) if known else "Unknown",
+                    "confidence": confidence,
+                    "present": confidence > PRESENT_SCORE,
+                    "bbox": [int(x), int(y), int(w), int(h)],
+                })
+            results.append(frame_results)
+        return results
+
+class MicroBatcher:
+    """Collects frames from concurrent requests and processes them together
+    
+    A batch is started by the first waiting request and closed after
+    max_wait seconds or once it holds max_batch frames, whichever is first.
+    Requests larger than max_batch are processed as one batch of their own.
+    """
+    
+    def __init__(self, process, max_batch=32, max_wait=0.005):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.frames = 0
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+    
+    def submit(self, frames):
+        """Queue frames; the returned future resolves to one result per frame"""
+        future = Future()
+        self.queue.put((frames, future))
+        return future
+    
+    def _next_batch(self):
+        item = self.queue.get()
+        if item is None:
+            return None
+        
+        batch = [item]
+        size = len(item[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self.queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            
+            frames = [frame for item_frames, _ in batch for frame in item_frames]
+            try:
+                results = self.process(frames)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            self.batches += 1
+            self.frames += len(frames)
+            start = 0
+            for item_frames, future in batch:
+                future.set_result(results[start:start + len(item_frames)])
+                start += len(item_frames)
+    
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+class RecognitionHandler(BaseHTTPRequestHandler):
+    """POST /recognize with a JPEG, raw frames or a JSON batch; GET /health"""
+    
+    server_version = "RecognitionService/1.0"
+    
+    def log_message(self, format, *args):
+        # Per-request logging would dominate the cost of small requests
+        pass
+    
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def read_frames(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        
+        if content_type == "application/json":
+            frames = json.loads(data)["frames"]
+            return [decode_jpeg(base64.b64decode(frame)) for frame in frames]
+        if content_type == "application/octet-stream":
+            return decode_raw(
+                data,
+                int(self.headers["X-Frame-Width"]),
+                int(self.headers["X-Frame-Height"]),
+                int(self.headers.get("X-Frame-Channels", 3)),
+            )
+        return [decode_jpeg(data)]
+    
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": "not found"})
+            return
+        service = self.server.service
+        self.send_json(200, {
+            "status": "ok",
+            "students": len(service.students),
+            "batches": service.batcher.batches,
+            "frames": service.batcher.frames,
+            "model_reloads": service.reloads(),
+        })
+    
+    def do_POST(self):
+        if self.path != "/recognize":
+            self.send_json(404, {"error": "not found"})
+            return
+        
+        try:
+            frames = self.read_frames()
+        except (KeyError, TypeError, ValueError) as e:
+            self.send_json(400, {"error": f"bad request: {e}"})
+            return
+        
+        try:
+            results = self.server.service.batcher.submit(frames).result(REQUEST_TIMEOUT)
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+        self.send_json(200, {"frames": results})
+
+class RecognitionService:
+    """The recognition model, loaded once, served over HTTP on localhost"""
+    
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, engine="lbph", shards=None, max_batch=32,
+                 max_wait=0.005, reload_interval=2.0, detect_workers=None, top_k=None):
+        self.host = host
+        self.port = port
+        self.engine = engine
+        self.shards = shards
+        self.top_k = top_k
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.reload_interval = reload_interval
+        self.detect_workers = detect_workers
+        self.reloaders = []
+        self.server = None
+        self.batcher = None
+        self.recognizer = None
+        self.students = None
+    
+    def reloads(self):
+        return sum(reloader.reloads for reloader in self.reloaders)
+    
+    def start(self):
+        """Load the model and start serving in the background; returns whether it started"""
+        recognizer = load_model(self.engine, self.shards, self.top_k)
+        detection_config = DetectionConfig.load()
+        detector = create_detector(detection_config, 1.2, 5)
+        students = load_student_data()
+        if recognizer is None or detector is None or students is None:
+            return False
+        
+        if self.reload_interval:
+            model_reloader = Reloader("model", lambda: load_model(self.engine, self.shards, self.top_k),
+                                      file_version(*model_files(self.engine)), self.reload_interval)
+            student_reloader = Reloader("student list", load_student_data, DatabaseVersion(), self.reload_interval)
+            model_reloader.start(recognizer)
+            student_reloader.start(students)
+            self.reloaders = [model_reloader, student_reloader]
+            recognizer = HotRecognizer(model_reloader)
+            students = HotStudents(student_reloader)
+        self.students = students
+        
+        self.recognizer = Recognizer(lambda: create_detector(detection_config, 1.2, 5, shared=False), recognizer,
+                                     students, workers=self.detect_workers)
+        self.batcher = MicroBatcher(self.recognizer.recognize, self.max_batch, self.max_wait)
+        self.batcher.start()
+        
+        self.server = ThreadingHTTPServer((self.host, self.port), RecognitionHandler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="http-server", daemon=True).start()
+        print(f"🌐 Recognition service listening on http://{self.host}:{self.port}")
+        return True
+    
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.batcher is not None:
+            self.batcher.stop()
+        if self.recognizer is not None:
+            self.recognizer.close()
+        for reloader in self.reloaders:
+            reloader.stop()
+            if isinstance(reloader.version, DatabaseVersion):
+                reloader.version.close()
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **options):
+    """Run the service until interrupted"""
+    service = RecognitionService(host, port, **options)
+    if not service.start():
+        return
+    print("📋 Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        print(f"🛑 Stopped after {service.batcher.frames} frames in {service.batcher.batches} batches")
+
+def synthetic_frame(width=640, height=480, seed=0):
+    """A noise frame for load tests when no image is given"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+def load_test(url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", image_path=None, requests=500, concurrency=8,
+              frames_per_request=1):
+    """Send JPEG requests from concurrent clients and report latency and throughput"""
+    frame = cv2.imread(image_path) if image_path else synthetic_frame()
+    if frame is None:
+        print(f"❌ Error: Could not read {image_path}")
+        return None
+    
+    jpeg = cv2.imencode(".jpg", frame)[1].tobytes()
+    if frames_per_request > 1:
+        encoded = base64.b64encode(jpeg).decode()
+        body = json.dumps({"frames": [encoded] * frames_per_request}).encode()
+        content_type = "application/json"
+    else:
+        body = jpeg
+        content_type = "image/jpeg"
+    
+    def send(_):
+        request = urllib.request.Request(url.rstrip("/") + "/recognize", data=body,
+                                         headers={"Content-Type": content_type})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            response.read()
+        return time.perf_counter() - start
+    
+    print(f"🚀 Sending {requests} requests ({frames_per_request} frames each) from {concurrency} clients")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "frames_per_request": frames_per_request,
+        "p50_ms": 1000 * percentile(latencies, 0.5),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+        "requests_per_sec": requests / elapsed,
+        "frames_per_sec": requests * frames_per_request / elapsed,
+    }
+    print(f"⏱️ p50 {result['p50_ms']:.1f} ms | p99 {result['p99_ms']:.1f} ms | "
+          f"{result['requests_per_sec']:.1f} requests/sec ({result['frames_per_sec']:.1f} frames/sec)")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless face recognition service")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    serve_parser = subparsers.add_parser("serve", help="load the model and serve recognition requests")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--engine", choices=["lbph", "embedding", "sharded"], default="lbph")
+    serve_parser.add_argument("--shards", metavar="NAMES", help="comma-separated shards to load with --engine sharded")
+    serve_parser.add_argument("--top-k", type=int, metavar="K",
+                              help="compare faces only with the samples of the K closest students (LBPH fast format)")
+    serve_parser.add_argument("--max-batch", type=int, default=32, help="most frames per batch (default: 32)")
+    serve_parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                              help="how long a batch waits for more requests (default: 5)")
+    serve_parser.add_argument("--detect-workers", type=int,
+                              help="threads detecting the frames of a batch (default: one per core)")
+    serve_parser.add_argument("--no-reload", action="store_true", help="do not pick up a retrained model")
+    
+    test_parser = subparsers.add_parser("loadtest", help="measure a running service")
+    test_parser.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    test_parser.add_argument("--image", help="image to send (default: a synthetic noise frame)")
+    test_parser.add_argument("--requests", type=int, default=500)
+    test_parser.add_argument("--concurrency", type=int, default=8)
+    test_parser.add_argument("--frames", type=int, default=1, help="frames per request")
+    args = parser.parse_args()
+    
+    if args.command == "serve":
+        serve(args.host, args.port, engine=args.engine, shards=args.shards.split(",") if args.shards else None,
+              max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000,
+              reload_interval=None if args.no_reload else 2.0, detect_workers=args.detect_workers,
+              top_k=args.top_k)
+    else:
+        load_test(args.url, args.image, args.requests, args.concurrency, args.frames)
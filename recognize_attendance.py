@@ -1,52 +1,409 @@
+import argparse
 import datetime
 import os
+import time
 import cv2
 import pandas as pd
+from attendance_db import import_if_empty, load_students, save_session
+from attendance_log import ATTENDANCE_COLUMNS, AttendanceLog, session_csv_path
+from attendance_pipeline import AttendancePipeline
+from embedding_model import EMBEDDING_MODEL_PATH, PARAMS_FILE as EMBEDDING_PARAMS_FILE, SFACE_MODEL_PATH, load_embedding_model
+from face_detection import DetectionConfig, DetectionScheduler, create_detector
+from face_tracker import FaceTracker
+from hot_reload import DatabaseVersion, HotRecognizer, HotStudents, Reloader, file_version
+from image_loader import normalize_face
+from lbph_model import FAST_MODEL_PATH, MODEL_PATH, PARAMS_FILE, load_recognizer, predict_faces
+from perf_metrics import Instrumentation, MetricsConfig, NullStats
+from process_pipeline import ProcessPipeline
+from sharded_model import MANIFEST_FILE, SHARDS_PATH, load_sharded_model
+
+PRESENT_SCORE = 70  # Confidence needed to mark a student present
+KNOWN_SCORE = 50  # Confidence needed to show a student's name
 
 def load_student_data():
-    """Load student data from CSV"""
-    csv_path = os.path.join("StudentDetails", "StudentDetails.csv")
-    
-    if not os.path.exists(csv_path):
-        print("❌ Error: StudentDetails.csv not found. Please add students first.")
-        return None
+    """Load students from the database as an ID to name dict
     
+    StudentDetails.csv and existing attendance CSVs are imported on first use.
+    """
     try:
-        df = pd.read_csv(csv_path)
-        print(f"📚 Loaded {len(df)} students from database")
-        return df
+        import_if_empty()
+        students = load_students()
+        if not students:
+            print("❌ Error: No students found. Please add students first.")
+            return None
+        
+        print(f"📚 Loaded {len(students)} students from database")
+        return students
     except Exception as e:
         print(f"❌ Error loading student data: {e}")
         return None
 
-def recognize_attendance():
-    """Main function for attendance recognition"""
+def predict_crops(recognizer, gray, faces):
+    """Predict all faces of a frame in one batch"""
+    crops = [normalize_face(gray[y:y + h, x:x + w]) for (x, y, w, h) in faces]
+    return predict_faces(recognizer, crops)
+
+def recognize_tracks(tracker, recognizer, gray, faces, tracks):
+    """Predict only the faces whose track is still voting on its identity"""
+    pending = [i for i, track in enumerate(tracks) if not track.confirmed]
+    predictions = predict_crops(recognizer, gray, [faces[i] for i in pending])
+    for i, (student_id, confidence) in zip(pending, predictions):
+        tracker.add_vote(tracks[i], student_id, confidence)
+    return [track.result() for track in tracks]
+
+def lookup_name(students, student_id):
+    """Get a student's name, or "Unknown" """
+    return students.get(student_id, "Unknown")
+
+class AttendanceSession:
+    """Students marked present in a session, in the order they were seen
+    
+    Records are kept in a list and only turned into a DataFrame when the
+    session is saved. With a log given, every new record is also handed to
+    it as it happens.
+    """
+    
+    COLUMNS = ATTENDANCE_COLUMNS
+    
+    def __init__(self, log=None):
+        self.present = set()
+        self.records = []
+        self.log = log
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __contains__(self, student_id):
+        return student_id in self.present
+    
+    def add(self, student_id, name):
+        """Mark a student present unless already recorded; returns whether it was new"""
+        if student_id in self.present:
+            return False
+        
+        timestamp = datetime.datetime.now()
+        self.present.add(student_id)
+        record = (student_id, name, timestamp.strftime('%Y-%m-%d'), timestamp.strftime('%H:%M:%S'))
+        self.records.append(record)
+        if self.log is not None:
+            self.log.append(record)
+        print(f"✅ Attendance recorded: {name} (ID: {student_id})")
+        return True
+    
+    def to_dataframe(self):
+        return pd.DataFrame(self.records, columns=self.COLUMNS)
+
+def annotate_faces(frame, faces, predictions, students, attendance, confirmed=None):
+    """Draw recognition results on the frame and record attendance
+    
+    With confirmed flags given, attendance is only recorded for faces
+    whose tracked identity has been confirmed.
+    """
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    if confirmed is None:
+        confirmed = [True] * len(predictions)
+    
+    for (x, y, w, h), (student_id, confidence), is_confirmed in zip(faces, predictions, confirmed):
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        
+        confidence_score = round(100 - confidence, 2)
+        
+        # Get student name
+        name = "Unknown"
+        if confidence_score > KNOWN_SCORE:  # Confidence threshold
+            name = lookup_name(students, student_id)
+        
+        # Prepare display text
+        if confidence_score > PRESENT_SCORE:
+            display_text = f"{name} [Present]"
+            text_color = (0, 255, 0)  # Green
+            
+            # Record attendance (avoid duplicates)
+            if is_confirmed:
+                attendance.add(student_id, name)
+        
+        elif confidence_score > KNOWN_SCORE:
+            display_text = f"{name} [Low Confidence]"
+            text_color = (0, 255, 255)  # Yellow
+        else:
+            display_text = "Unknown"
+            text_color = (0, 0, 255)  # Red
+        
+        # Display text on frame
+        cv2.putText(frame, display_text, (x + 5, y - 5), font, 0.8, text_color, 2)
+        cv2.putText(frame, f"{confidence_score}%", (x + 5, y + h - 5), font, 0.6, text_color, 1)
+    
+    # Show attendance count
+    cv2.putText(frame, f"Present: {len(attendance)}", (10, 30), font, 0.8, (255, 255, 255), 2)
+    return attendance
+
+def recognize_stream(cam, scheduler, recognizer, tracker, stride=1, stats=None):
+    """Headless recognition loop over any video source
+    
+    Yields (frame_index, present) for every processed frame, where present
+    lists (student_id, confidence_score) of tracks confirmed as present on
+    that frame. Each track is reported once. With stride > 1 only every
+    stride-th frame is decoded. With stats given, the decode, detect and
+    recognize stages are timed into it.
+    """
+    stats = stats or NullStats()
+    reported = set()
+    frame_index = -1
+    
+    while True:
+        # grab() skips frames without decoding them
+        skipped = 0
+        while skipped < stride - 1 and cam.grab():
+            skipped += 1
+        frame_index += skipped
+        
+        with stats.time("decode"):
+            ret, frame = cam.read()
+        if not ret:
+            break
+        frame_index += 1
+        
+        with stats.time("detect"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = scheduler.detect(gray)
+            tracks = tracker.update(faces)
+        with stats.time("recognize"):
+            recognize_tracks(tracker, recognizer, gray, faces, tracks)
+        
+        present = []
+        for track in tracks:
+            if track.confirmed and track.track_id not in reported:
+                reported.add(track.track_id)
+                student_id, confidence = track.identity
+                confidence_score = round(100 - confidence, 2)
+                if confidence_score > PRESENT_SCORE:
+                    present.append((student_id, confidence_score))
+        
+        yield frame_index, present
+
+def run_sequential(cam, scheduler, recognizer, students, attendance, tracker=None, metrics_config=None):
+    """Capture, detect, recognize and display one frame at a time"""
+    metrics = Instrumentation("attendance", metrics_config)
+    
+    while True:
+        captured_at = time.perf_counter()
+        with metrics.time("capture"):
+            ret, frame = cam.read()
+        if not ret:
+            break
+        
+        with metrics.time("detect"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = scheduler.detect(gray)
+        
+        with metrics.time("recognize"):
+            if tracker is not None:
+                tracks = tracker.update(faces)
+                predictions = recognize_tracks(tracker, recognizer, gray, faces, tracks)
+                confirmed = [track.confirmed for track in tracks]
+            else:
+                predictions = predict_crops(recognizer, gray, faces)
+                confirmed = None
+        
+        with metrics.time("annotate"):
+            attendance = annotate_faces(frame, faces, predictions, students, attendance, confirmed)
+            metrics.annotate(frame)
+        
+        with metrics.time("display"):
+            cv2.imshow('Attendance System - Press Q to quit', frame)
+            key = cv2.waitKey(1) & 0xFF
+        metrics.frame_done(captured_at)
+        
+        if key == ord('q'):
+            break
+    
+    metrics.close()
+    return attendance
+
+def run_threaded(cam, scheduler, recognizer, students, attendance, config=None, tracker=None, metrics_config=None):
+    """Run capture, detection and recognition in background threads and display here"""
+    if tracker is not None:
+        track = tracker.update
+        recognize = lambda gray, faces, tracks: recognize_tracks(tracker, recognizer, gray, faces, tracks)
+    else:
+        track = None
+        recognize = lambda gray, faces, tracks: predict_crops(recognizer, gray, faces)
+    
+    pipeline = AttendancePipeline(
+        cam,
+        scheduler.detect,
+        recognize,
+        config,
+        track,
+    )
+    metrics = Instrumentation("attendance", metrics_config, pipeline.stats)
+    pipeline.start()
+    
+    try:
+        while True:
+            result = pipeline.next_result()
+            if result is None:
+                break
+            
+            with metrics.time("render"):
+                confirmed = [track.confirmed for track in result.tracks] if result.tracks else None
+                attendance = annotate_faces(result.frame, result.faces, result.predictions, students, attendance, confirmed)
+                metrics.annotate(result.frame)
+                cv2.imshow('Attendance System - Press Q to quit', result.frame)
+                key = cv2.waitKey(1) & 0xFF
+            metrics.frame_done(result.captured_at)
+            
+            if key == ord('q'):
+                break
+    finally:
+        pipeline.stop()
+        metrics.close()
+    
+    return attendance
+
+def run_processes(model_args, detection_config, students, attendance, tracker=None, metrics_config=None,
+                  workers=None, source=0):
+    """Capture and recognize in separate processes that share frames through shared memory; display here"""
+    pipeline = ProcessPipeline(source, load_model, model_args, detection_config, workers)
+    metrics = Instrumentation("attendance", metrics_config, pipeline.stats)
+    pipeline.start()
+    print(f"⚡ Recognizing in {pipeline.workers} worker processes")
+    
+    try:
+        while True:
+            result = pipeline.next_result()
+            if result is None:
+                break
+            
+            with metrics.time("render"):
+                predictions = result.predictions
+                confirmed = None
+                if tracker is not None:
+                    # Workers recognize every face; tracks still vote on frames in order
+                    tracks = tracker.update(result.faces)
+                    for track, (student_id, confidence) in zip(tracks, predictions):
+                        if not track.confirmed:
+                            tracker.add_vote(track, student_id, confidence)
+                    predictions = [track.result() for track in tracks]
+                    confirmed = [track.confirmed for track in tracks]
+                attendance = annotate_faces(result.frame, result.faces, predictions, students, attendance, confirmed)
+                metrics.annotate(result.frame)
+                cv2.imshow('Attendance System - Press Q to quit', result.frame)
+                key = cv2.waitKey(1) & 0xFF
+            pipeline.release(result)
+            metrics.frame_done(result.captured_at)
+            
+            if key == ord('q'):
+                break
+    finally:
+        pipeline.stop()
+        metrics.close()
+    
+    return attendance
+
+def load_model(engine="lbph", shards=None, top_k=None):
+    """Load the trained recognizer of an engine, or None if it is missing
+    
+    For the sharded engine, shards names the shards this station needs;
+    all shards are loaded by default. With top_k set, the fast LBPH format
+    only compares faces with the samples of the top_k closest students.
+    """
+    if engine == "sharded":
+        if not os.path.exists(SHARDS_PATH):
+            print(f"❌ Error: {SHARDS_PATH} not found. Please train the model with sharded_model.py train.")
+            return None
+        try:
+            return load_sharded_model(names=shards, top_k=top_k)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return None
+    
+    if engine == "embedding":
+        if not os.path.exists(SFACE_MODEL_PATH):
+            print(f"❌ Error: {SFACE_MODEL_PATH} not found")
+            return None
+        if not os.path.exists(EMBEDDING_MODEL_PATH):
+            print(f"❌ Error: {EMBEDDING_MODEL_PATH} not found. Please train the model with --engine embedding.")
+            return None
+        return load_embedding_model()
+    
+    model_path = "trainer.yml"
+    if not os.path.exists(model_path):
+        print("❌ Error: trainer.yml not found. Please train the model first.")
+        return None
+    return load_recognizer(model_path, top_k=top_k)
+
+def model_files(engine="lbph"):
+    """Files whose change means the engine's model was retrained
+    
+    Every writer replaces these last, once the rest of the model is complete.
+    """
+    if engine == "embedding":
+        return [os.path.join(EMBEDDING_MODEL_PATH, EMBEDDING_PARAMS_FILE)]
+    if engine == "sharded":
+        return [os.path.join(SHARDS_PATH, MANIFEST_FILE)]
+    return [MODEL_PATH, os.path.join(FAST_MODEL_PATH, PARAMS_FILE)]
+
+def recognize_attendance(threaded=False, pipeline_config=None, tracking=True, detection_config=None,
+                         metrics_config=None, engine="lbph", shards=None, reload_interval=2.0, processes=None,
+                         top_k=None):
+    """Main function for attendance recognition
+    
+    With reload_interval set, the model and the student list are watched
+    and a retrained model or newly enrolled student is picked up without
+    restarting the session. With processes set, capture and recognition
+    run in that many worker processes instead; the workers load the model
+    once, so only the student list is reloaded.
+    """
+    reloaders = []
+    attendance_log = None
     try:
         # Load trained model
-        model_path = "trainer.yml"
-        if not os.path.exists(model_path):
-            print("❌ Error: trainer.yml not found. Please train the model first.")
+        recognizer = load_model(engine, shards, top_k)
+        if recognizer is None:
             return
         
-        recognizer = cv2.face.LBPHFaceRecognizer_create()
-        recognizer.read(model_path)
-        
-        # Load face cascade
-        cascade_path = "haarcascade_frontalface_default.xml"
-        if not os.path.exists(cascade_path):
-            print("❌ Error: haarcascade_frontalface_default.xml not found")
+        # Load face detector
+        detection_config = detection_config or DetectionConfig.load()
+        detector = create_detector(detection_config, 1.2, 5)
+        if detector is None:
             return
         
-        face_cascade = cv2.CascadeClassifier(cascade_path)
-        
         # Load student data
-        df = load_student_data()
-        if df is None:
+        students = load_student_data()
+        if students is None:
             return
         
-        # Initialize attendance tracking
-        attendance_cols = ['Id', 'Name', 'Date', 'Time']
-        attendance = pd.DataFrame(columns=attendance_cols)
+        # Swap in new versions of the model and students as they appear
+        if reload_interval:
+            student_reloader = Reloader("student list", load_student_data, DatabaseVersion(), reload_interval)
+            student_reloader.start(students)
+            reloaders.append(student_reloader)
+            students = HotStudents(student_reloader)
+        if reload_interval and not processes:
+            model_reloader = Reloader("model", lambda: load_model(engine, shards, top_k),
+                                      file_version(*model_files(engine)), reload_interval)
+            model_reloader.start(recognizer)
+            reloaders.append(model_reloader)
+            recognizer = HotRecognizer(model_reloader)
+        
+        # Initialize attendance tracking; records are logged as they happen
+        attendance_log = AttendanceLog()
+        attendance_log.start()
+        attendance = AttendanceSession(attendance_log)
+        
+        # Recognize each tracked face on its first few frames only
+        tracker = FaceTracker() if tracking else None
+        
+        if processes:
+            # The capture process opens the camera itself
+            print("🎥 Starting attendance recognition...")
+            print("📋 Press 'q' to quit and save attendance")
+            attendance = run_processes((engine, shards, top_k), detection_config, students, attendance, tracker,
+                                       metrics_config, processes)
+            cv2.destroyAllWindows()
+            save_session_records(attendance_log, attendance)
+            return
         
         # Initialize camera
         cam = cv2.VideoCapture(0)
@@ -60,92 +417,69 @@ def recognize_attendance():
         # Define minimum window size
         min_w = 0.1 * cam.get(3)
         min_h = 0.1 * cam.get(4)
+        min_size = (int(min_w), int(min_h))
+        
+        # Full-frame detection only every few frames or on motion
+        scheduler = DetectionScheduler(detector, detection_config, min_size=min_size)
         
         print("🎥 Starting attendance recognition...")
         print("📋 Press 'q' to quit and save attendance")
         print("✅ Green text = Recognized | 🟡 Yellow text = Low confidence | ❌ Red text = Unknown")
         
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        
-        while True:
-            ret, frame = cam.read()
-            if not ret:
-                break
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(
-                gray, 1.2, 5, 
-                minSize=(int(min_w), int(min_h)),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
-            
-            for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                
-                # Predict face
-                student_id, confidence = recognizer.predict(gray[y:y + h, x:x + w])
-                confidence_score = round(100 - confidence, 2)
-                
-                # Get student name
-                name = "Unknown"
-                if confidence_score > 50:  # Confidence threshold
-                    try:
-                        name_series = df.loc[df['Id'] == student_id]['Name']
-                        if not name_series.empty:
-                            name = name_series.values[0]
-                    except:
-                        name = "Unknown"
-                
-                # Prepare display text
-                if confidence_score > 70:
-                    display_text = f"{name} [Present]"
-                    text_color = (0, 255, 0)  # Green
-                    
-                    # Record attendance (avoid duplicates)
-                    if student_id not in attendance['Id'].values:
-                        timestamp = datetime.datetime.now()
-                        date_str = timestamp.strftime('%Y-%m-%d')
-                        time_str = timestamp.strftime('%H:%M:%S')
-                        
-                        new_record = pd.DataFrame({
-                            'Id': [student_id],
-                            'Name': [name],
-                            'Date': [date_str],
-                            'Time': [time_str]
-                        })
-                        attendance = pd.concat([attendance, new_record], ignore_index=True)
-                        print(f"✅ Attendance recorded: {name} (ID: {student_id})")
-                
-                elif confidence_score > 50:
-                    display_text = f"{name} [Low Confidence]"
-                    text_color = (0, 255, 255)  # Yellow
-                else:
-                    display_text = "Unknown"
-                    text_color = (0, 0, 255)  # Red
-                
-                # Display text on frame
-                cv2.putText(frame, display_text, (x + 5, y - 5), font, 0.8, text_color, 2)
-                cv2.putText(frame, f"{confidence_score}%", (x + 5, y + h - 5), font, 0.6, text_color, 1)
-            
-            # Show attendance count
-            cv2.putText(frame, f"Present: {len(attendance)}", (10, 30), font, 0.8, (255, 255, 255), 2)
-            cv2.imshow('Attendance System - Press Q to quit', frame)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+        if threaded:
+            attendance = run_threaded(cam, scheduler, recognizer, students, attendance, pipeline_config, tracker,
+                                      metrics_config)
+        else:
+            attendance = run_sequential(cam, scheduler, recognizer, students, attendance, tracker, metrics_config)
         
         # Cleanup
         cam.release()
         cv2.destroyAllWindows()
         
-        # Save attendance
-        if not attendance.empty:
-            save_attendance(attendance)
-        else:
-            print("📝 No attendance recorded")
+        save_session_records(attendance_log, attendance)
     
     except Exception as e:
         print(f"❌ Error during recognition: {e}")
+    
+    finally:
+        # Already closed unless the session ended early; never leave the log's thread running
+        if attendance_log is not None:
+            filepath = attendance_log.close()
+            if filepath:
+                store_session(filepath, attendance_log.rows)
+        for reloader in reloaders:
+            reloader.stop()
+            if isinstance(reloader.version, DatabaseVersion):
+                reloader.version.close()
+
+def save_session_records(attendance_log, attendance):
+    """Finish the session's log file, store it in the database and report it"""
+    filepath = attendance_log.close(attendance.records)
+    if filepath:
+        store_session(filepath, attendance.records)
+        report_attendance(attendance.to_dataframe(), filepath)
+    else:
+        print("📝 No attendance recorded")
+
+def store_session(filepath, records):
+    """Add a saved session's records to the attendance database"""
+    try:
+        save_session(filepath, records)
+    except Exception as e:
+        # The CSV is already written, so the session can be imported later
+        print(f"⚠️ Warning: Could not store attendance in the database: {e}")
+
+def report_attendance(attendance_df, filepath):
+    """Print where attendance was saved and who attended"""
+    print(f"✅ Attendance saved successfully!")
+    print(f"📁 File: {filepath}")
+    print(f"👥 Total attendees: {len(attendance_df)}")
+    
+    # Display attendance summary
+    print("\n📋 Attendance Summary:")
+    print("-" * 40)
+    for _, row in attendance_df.iterrows():
+        print(f"ID: {row['Id']} | Name: {row['Name']} | Time: {row['Time']}")
 
 def save_attendance(attendance_df):
     """Save attendance to CSV file"""
@@ -155,27 +489,77 @@ def save_attendance(attendance_df):
             os.makedirs("Attendance")
         
         # Generate filename with timestamp
-        timestamp = datetime.datetime.now()
-        date_str = timestamp.strftime('%Y-%m-%d')
-        time_str = timestamp.strftime('%H-%M-%S')
-        filename = f"Attendance_{date_str}_{time_str}.csv"
-        filepath = os.path.join("Attendance", filename)
+        filepath = session_csv_path()
         
         # Save to CSV
         attendance_df.to_csv(filepath, index=False)
-        
-        print(f"✅ Attendance saved successfully!")
-        print(f"📁 File: {filepath}")
-        print(f"👥 Total attendees: {len(attendance_df)}")
-        
-        # Display attendance summary
-        print("\n📋 Attendance Summary:")
-        print("-" * 40)
-        for _, row in attendance_df.iterrows():
-            print(f"ID: {row['Id']} | Name: {row['Name']} | Time: {row['Time']}")
+        store_session(filepath, attendance_df[ATTENDANCE_COLUMNS].itertuples(index=False))
+        report_attendance(attendance_df, filepath)
     
     except Exception as e:
         print(f"❌ Error saving attendance: {e}")
 
+def benchmark_lookup(roster_sizes=(100, 1000, 10000, 100000), lookups=2000):
+    """Compare per-face name lookup and dedup cost of the DataFrame scan and the dict index"""
+    print("📊 Student lookup benchmark (microseconds per face)")
+    print("-" * 40)
+    results = []
+    
+    for size in roster_sizes:
+        df = pd.DataFrame({'Id': range(size), 'Name': [f"Student{i}" for i in range(size)]})
+        # The ID to name dict load_students() returns
+        students = dict(zip(df['Id'], df['Name']))
+        attendance = pd.DataFrame({'Id': range(0, size, 2)})
+        session = AttendanceSession()
+        session.present.update(range(0, size, 2))
+        queries = [(i * 7919) % size for i in range(lookups)]
+        
+        start = time.perf_counter()
+        for student_id in queries:
+            df.loc[df['Id'] == student_id]['Name'].values[0]
+            student_id in attendance['Id'].values
+        scan_us = (time.perf_counter() - start) / lookups * 1e6
+        
+        start = time.perf_counter()
+        for student_id in queries:
+            lookup_name(students, student_id)
+            student_id in session
+        index_us = (time.perf_counter() - start) / lookups * 1e6
+        
+        results.append({"roster": size, "scan_us": scan_us, "index_us": index_us})
+        print(f"{size:>7} students: DataFrame scan {scan_us:9.2f} | index {index_us:6.3f}")
+    
+    return results
+
 if __name__ == "__main__":
-    recognize_attendance()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Take attendance with face recognition")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run capture, detection and recognition in parallel stages")
+    parser.add_argument("--no-tracking", action="store_true",
+                        help="recognize every face on every frame")
+    parser.add_argument("--profile", action="store_true", help="time each stage and print a summary")
+    parser.add_argument("--overlay", action="store_true", help="show FPS and stage latency on the video")
+    parser.add_argument("--metrics", metavar="FILE", help="write stage metrics in Prometheus format to FILE")
+    parser.add_argument("--engine", choices=["lbph", "embedding", "sharded"], default="lbph",
+                        help="recognizer to use (default: lbph)")
+    parser.add_argument("--shards", metavar="NAMES",
+                        help="comma-separated shards to load with --engine sharded (default: all)")
+    parser.add_argument("--top-k", type=int, metavar="K",
+                        help="compare faces only with the samples of the K closest students (LBPH fast format)")
+    parser.add_argument("--processes", type=int, metavar="N",
+                        help="capture and recognize in N worker processes sharing frames through shared memory; "
+                             "disables model hot-reload")
+    parser.add_argument("--no-reload", action="store_true",
+                        help="do not pick up a retrained model or new students during the session")
+    parser.add_argument("--benchmark-lookup", action="store_true",
+                        help="measure student lookup cost against roster size and exit")
+    args = parser.parse_args()
+    
+    if args.benchmark_lookup:
+        benchmark_lookup()
+    else:
+        metrics_config = MetricsConfig(args.profile, args.overlay, args.metrics)
+        recognize_attendance(threaded=args.threaded, tracking=not args.no_tracking, metrics_config=metrics_config,
+                             engine=args.engine, shards=args.shards.split(",") if args.shards else None,
+                             reload_interval=None if args.no_reload else 2.0, processes=args.processes,
+                             top_k=args.top_k)
\ No newline at end of file
@@ -0,0 +1,220 @@
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import cv2
+import numpy as np
+from face_cache import FaceCache
+from lbph_model import load_fast_model, save_fast_model
+from train_model import TRAINING_PATH, scan_training_images, stream_train, update_training_status
+
+SHARDS_PATH = "trainer_shards"
+SHARD_MAP_PATH = os.path.join("StudentDetails", "Shards.csv")
+MANIFEST_FILE = "shards.json"
+SHARD_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Opened once per training process by init_worker
+_cache = None
+
+def load_shard_map(path=SHARD_MAP_PATH):
+    """Map student ID to shard name from a CSV with Id and Shard columns
+    
+    Shards name a group of students that are recognized together, such as
+    a building or a course. The file is optional.
+    """
+    shard_map = {}
+    if not os.path.exists(path):
+        return shard_map
+    
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                student_id = int(float(row["Id"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            shard = (row.get("Shard") or "").strip()
+            if not SHARD_NAME.match(shard):
+                print(f"⚠️ Warning: Ignoring shard name {shard!r} of student {student_id}")
+                continue
+            shard_map[student_id] = shard
+    return shard_map
+
+def assign_shards(student_ids, shard_count=4, shard_map=None):
+    """Group student IDs by shard
+    
+    Students listed in shard_map go to their named shard; the rest are
+    spread over shard_count numbered shards by ID.
+    """
+    shard_map = shard_map or {}
+    shards = {}
+    for student_id in sorted(student_ids):
+        shard = shard_map.get(student_id) or f"shard{student_id % shard_count}"
+        shards.setdefault(shard, []).append(student_id)
+    return shards
+
+def init_worker():
+    """Open the training cache once per worker process"""
+    global _cache
+    # Parallelism comes from the process pool, not from OpenCV threads
+    cv2.setNumThreads(1)
+    _cache = FaceCache()
+
+def train_shard(shard, student_ids, path=SHARDS_PATH):
+    """Train one shard and write it as a fast model
+    
+    Returns (shard, faces, students, seconds).
+    """
+    start = time.perf_counter()
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    rows = _cache.rows_for(set(student_ids))
+    count, trained_ids = stream_train(recognizer, _cache.iter_chunks(rows))
+    
+    save_fast_model(recognizer, os.path.join(path, shard))
+    
+    return shard, count, len(trained_ids), time.perf_counter() - start
+
+def train_sharded(shard_count=4, workers=None, shard_map_path=SHARD_MAP_PATH, path=SHARDS_PATH):
+    """Train every shard of the roster in parallel worker processes"""
+    try:
+        print("🤖 Starting sharded model training...")
+        started_at = time.time()
+        students = scan_training_images(TRAINING_PATH)
+        if not students:
+            print("❌ Error: No training images found")
+            return
+        
+        print(f"📁 Found {sum(len(files) for files in students.values())} training images")
+        cache = FaceCache()
+        cache.sync(TRAINING_PATH, students)
+        
+        # Students without cached faces would leave empty shards
+        cached = set(int(student_id) for student_id in np.unique(cache.labels[cache.rows_for()]))
+        shards = assign_shards(cached & set(students), shard_count, load_shard_map(shard_map_path))
+        if not shards:
+            print("❌ Error: No valid training data found")
+            return
+        
+        os.makedirs(path, exist_ok=True)
+        print(f"🎯 Training {len(shards)} shards...")
+        start = time.perf_counter()
+        manifest = {}
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [pool.submit(train_shard, shard, ids, path) for shard, ids in shards.items()]
+            for future in as_completed(futures):
+                shard, count, student_count, seconds = future.result()
+                manifest[shard] = {"students": shards[shard], "faces": count}
+                print(f"✅ {shard}: {count} images from {student_count} people in {seconds:.1f}s")
+        
+        # The manifest is replaced last, so loaders only see complete shards
+        tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"shards": manifest}, f)
+        os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+        
+        # Remove shards that no longer have students
+        for entry in os.scandir(path):
+            if entry.is_dir() and entry.name not in manifest:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        
+        update_training_status(students, "sharded", started_at)
+        elapsed = time.perf_counter() - start
+        print(f"📊 Trained {len(manifest)} shards in {elapsed:.1f}s")
+        print(f"📁 Shards saved in: {path}")
+    
+    except Exception as e:
+        print(f"❌ Error during sharded training: {e}")
+
+def load_manifest(path=SHARDS_PATH):
+    """Shards of a sharded model as {shard: {"students": [...], "faces": n}}"""
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)["shards"]
+
+class ShardedModel:
+    """Recognizer front-end over several LBPH shards
+    
+    Faces are turned into LBPH features once, every shard is matched in its
+    own thread (NumPy releases the GIL in the distance loops), and the
+    closest match across shards wins. Follows the LBPHModel contract, so it
+    plugs into predict_faces().
+    """
+    
+    def __init__(self, shards, workers=None):
+        self.shards = shards
+        self.models = [model for model in shards.values() if len(model.labels)]
+        self.threshold = min((model.threshold for model in self.models), default=0.0)
+        self.executor = None
+        if len(self.models) > 1:
+            self.executor = ThreadPoolExecutor(max_workers=workers or len(self.models),
+                                               thread_name_prefix="shard")
+    
+    def predict(self, face):
+        return self.predict_batch([face])[0]
+    
+    def predict_batch(self, faces):
+        if not len(faces):
+            return []
+        if not self.models:
+            return [(-1, float(np.finfo(np.float64).max))] * len(faces)
+        
+        # Shards are trained with the same parameters, so features are shared
+        queries = self.models[0].histograms_of(faces)
+        if self.executor is None:
+            matches = [self.models[0].match(queries)]
+        else:
+            matches = list(self.executor.map(lambda model: model.match(queries), self.models))
+        
+        labels = np.stack([shard_labels for shard_labels, _ in matches])
+        distances = np.stack([shard_distances for _, shard_distances in matches])
+        best = distances.argmin(axis=0)
+        
+        results = []
+        for face, shard in enumerate(best):
+            distance = distances[shard, face]
+            if distance < self.threshold:
+                results.append((int(labels[shard, face]), float(distance)))
+            else:
+                results.append((-1, float(np.finfo(np.float64).max)))
+        return results
+    
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+def load_sharded_model(path=SHARDS_PATH, names=None, top_k=None, workers=None):
+    """Open the given shards, or all of them, as one ShardedModel"""
+    manifest = load_manifest(path)
+    names = list(manifest) if names is None else list(names)
+    missing = [name for name in names if name not in manifest]
+    if missing:
+        raise ValueError(f"unknown shards: {', '.join(missing)}")
+    
+    shards = {name: load_fast_model(os.path.join(path, name), top_k=top_k) for name in names}
+    params = {json.dumps(model.params(), sort_keys=True) for model in shards.values() if len(model.labels)}
+    if len(params) > 1:
+        raise ValueError("shards were trained with different LBPH parameters")
+    
+    print(f"⚡ Loaded {len(shards)} shards with {sum(len(model.labels) for model in shards.values())} faces")
+    return ShardedModel(shards, workers)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded face recognition model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    train_parser = subparsers.add_parser("train", help="train every shard in parallel")
+    train_parser.add_argument("--shards", type=int, default=4,
+                              help="number of shards for students without a named shard (default: 4)")
+    train_parser.add_argument("--workers", type=int, help="training processes (default: one per core)")
+    
+    subparsers.add_parser("list", help="list the trained shards")
+    args = parser.parse_args()
+    
+    if args.command == "train":
+        train_sharded(args.shards, args.workers)
+    else:
+        for shard, info in load_manifest().items():
+            print(f"{shard}: {len(info['students'])} students, {info['faces']} faces")
@@ -0,0 +1,106 @@
+import argparse
+import datetime
+import json
+import os
+import time
+from attendance_db import import_training_status, status_indexed, training_summary
+from train_model import MODEL_PATH, TRAINING_PATH, load_manifest, scan_training_images
+
+REQUIRED_FILES = [
+    ("haarcascade_frontalface_default.xml", "Face detection model"),
+    (MODEL_PATH, "Trained recognition model"),
+]
+REQUIRED_DIRS = [
+    (TRAINING_PATH, "Training images storage"),
+    ("StudentDetails", "Student database"),
+    ("Attendance", "Attendance records"),
+]
+
+def format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp else None
+
+def build_status_index():
+    """Fill the status index from one scan of TrainingImage and the training manifest
+    
+    Only needed once for data captured before the index existed; capture
+    and training keep it up to date afterwards.
+    """
+    students = scan_training_images(TRAINING_PATH)
+    trained = load_manifest() or {}
+    trained_at = os.path.getmtime(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+    if students:
+        print(f"🔄 Indexing {sum(len(files) for files in students.values())} training images...")
+    import_training_status(students, trained, trained_at)
+
+def system_status(pending_limit=100, engine="lbph"):
+    """Status of the files, training data and models as a JSON-ready dict
+    
+    Trained and pending students are counted for the given engine's model;
+    every model also reports its own pending count.
+    """
+    if not status_indexed():
+        build_status_index()
+    summary = training_summary(pending_limit, engine)
+    
+    summary["last_capture"] = format_time(summary["last_capture"])
+    for model in summary["models"].values():
+        model["trained_at"] = format_time(model["trained_at"])
+    
+    return {
+        "generated_at": format_time(time.time()),
+        "files": {filename: os.path.exists(filename) for filename, _ in REQUIRED_FILES},
+        "directories": {dirname: os.path.isdir(dirname) for dirname, _ in REQUIRED_DIRS},
+        "training": summary,
+    }
+
+def print_status(status):
+    """Display a system_status() result"""
+    print("\n🔍 SYSTEM STATUS CHECK")
+    print("-" * 40)
+    
+    for filename, description in REQUIRED_FILES:
+        print(f"{description}: {'✅ Found' if status['files'][filename] else '❌ Missing'}")
+    
+    for dirname, description in REQUIRED_DIRS:
+        print(f"{description}: {'✅ Found' if status['directories'][dirname] else '❌ Missing'}")
+    
+    training = status["training"]
+    print(f"👥 Registered students: {training['registered_students']}")
+    if training["images"]:
+        print(f"📊 Training data: {training['images']} images from {training['students_with_images']} students "
+              f"(last capture {training['last_capture']})")
+        print(f"🤖 Trained students ({training['engine']}): {training['trained_students']} | "
+              f"Pending training: {training['pending_students']}")
+        if training["pending_ids"]:
+            shown = ", ".join(str(student_id) for student_id in training["pending_ids"][:10])
+            more = training["pending_students"] - min(10, len(training["pending_ids"]))
+            print(f"⏳ Pending: {shown}{f' and {more} more' if more > 0 else ''}")
+    else:
+        print("📊 Training data: No images found")
+    
+    for engine, model in training["models"].items():
+        print(f"📦 Model {engine}: version {model['version']}, trained {model['trained_at']} "
+              f"on {model['images']} images from {model['students']} students, "
+              f"{model['pending_students']} pending")
+    
+    print("-" * 40)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="System status from the maintained status index")
+    parser.add_argument("--json", action="store_true", help="print the status as JSON")
+    parser.add_argument("--output", help="write the JSON status to this file")
+    parser.add_argument("--pending-limit", type=int, default=100, help="most pending student IDs to list")
+    parser.add_argument("--engine", choices=["lbph", "embedding", "sharded"], default="lbph",
+                        help="model whose trained and pending students are listed (default: lbph)")
+    args = parser.parse_args()
+    
+    status = system_status(args.pending_limit, args.engine)
+    if args.output:
+        tmp_path = args.output + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_path, args.output)
+    if args.json:
+        print(json.dumps(status, indent=2))
+    elif not args.output:
+        print_status(status)
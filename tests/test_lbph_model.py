@@ -0,0 +1,40 @@
+import os
+import sys
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lbph_model import LBPHModel, lbp_image, spatial_histogram
+
+def make_faces(count, size=(64, 64), seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, size=(4,) + size, dtype=np.uint8)
+    faces = []
+    for index in range(count):
+        noise = rng.integers(-20, 21, size=size)
+        faces.append(np.clip(base[index % 4].astype(np.int32) + noise, 0, 255).astype(np.uint8))
+    return faces, np.array([index % 4 for index in range(count)], dtype=np.int32)
+
+def train_cv2(faces, labels):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, labels)
+    return recognizer
+
+def test_histograms_match_opencv():
+    faces, labels = make_faces(8)
+    recognizer = train_cv2(faces, labels)
+    for face, expected in zip(faces, recognizer.getHistograms()):
+        histogram = spatial_histogram(lbp_image(face))
+        np.testing.assert_allclose(histogram, expected.ravel(), atol=1e-6)
+
+def test_predict_batch_matches_opencv():
+    faces, labels = make_faces(8)
+    recognizer = train_cv2(faces, labels)
+    model = LBPHModel.from_recognizer(recognizer)
+    queries, _ = make_faces(6, seed=1)
+    for (label, distance), query in zip(model.predict_batch(queries), queries):
+        expected_label, expected_distance = recognizer.predict(query)
+        assert label == expected_label
+        assert distance == pytest.approx(expected_distance, rel=1e-6)
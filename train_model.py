@@ -1,50 +1,249 @@
+import argparse
+import json
 import os
+import shutil
+import tempfile
+import time
 import cv2
 import numpy as np
-from PIL import Image
+from attendance_db import record_removal, record_training
+from embedding_model import EMBEDDING_MODEL_PATH, SFACE_MODEL_PATH, train_embedding_model
+from face_cache import FaceCache
+from image_loader import load_faces, parse_student_id
+from lbph_model import FAST_MODEL_PATH, save_fast_model, save_recognizer
 
-def get_images_and_labels(path):
-    """Extract images and labels from training directory"""
+MODEL_PATH = "trainer.yml"
+MANIFEST_PATH = "trainer_manifest.json"
+TRAINING_PATH = "TrainingImage"
+REMOVED_PATH = "RemovedImages"
+
+def scan_training_images(path):
+    """Group training images by student ID together with their modification times"""
+    students = {}
+    if not os.path.exists(path):
+        return students
+    
+    for entry in os.scandir(path):
+        if not entry.name.endswith('.jpg'):
+            continue
+        try:
+            student_id = parse_student_id(entry.name)
+        except (IndexError, ValueError):
+            print(f"⚠️ Warning: Skipping badly named image {entry.name}")
+            continue
+        students.setdefault(student_id, {})[entry.name] = entry.stat().st_mtime
+    
+    return students
+
+def list_training_images(path):
+    """List training image paths, or an empty list if there are none"""
     if not os.path.exists(path):
         print(f"❌ Error: Training directory '{path}' not found")
-        return [], []
+        return []
     
     image_paths = [os.path.join(path, f) for f in os.listdir(path) if f.endswith('.jpg')]
     
     if not image_paths:
         print("❌ Error: No training images found")
-        return [], []
-    
-    faces = []
-    ids = []
+        return []
     
     print(f"📁 Found {len(image_paths)} training images")
+    return image_paths
+
+def get_images_and_labels(path):
+    """Extract images and labels from training directory"""
+    image_paths = list_training_images(path)
+    if not image_paths:
+        return [], []
     
-    for image_path in image_paths:
-        try:
-            # Load image and convert to grayscale
-            pil_image = Image.open(image_path).convert('L')
-            image_np = np.array(pil_image, 'uint8')
-            
-            # Extract ID from filename (format: name.id.sample.jpg)
-            filename = os.path.basename(image_path)
-            student_id = int(filename.split(".")[1])
-            
-            faces.append(image_np)
-            ids.append(student_id)
-            
-        except Exception as e:
-            print(f"⚠️ Warning: Could not process {image_path}: {e}")
-            continue
+    faces, ids = load_faces(image_paths)
     
     print(f"✅ Successfully processed {len(faces)} images")
     return faces, ids
 
-def train_model():
+def stream_train(recognizer, chunks, update=False):
+    """Feed (faces, ids) chunks to the recognizer one at a time
+    
+    Returns the number of images and the set of student IDs trained on.
+    """
+    count = 0
+    student_ids = set()
+    
+    for faces, ids in chunks:
+        # LBPH update() appends histograms, so chunked training is
+        # equivalent to a single train() call over all images
+        if update:
+            recognizer.update(faces, ids)
+        else:
+            recognizer.train(faces, ids)
+            update = True
+        count += len(faces)
+        student_ids.update(int(student_id) for student_id in ids)
+    
+    return count, student_ids
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    """Load the record of which training images are already in the model"""
+    if not os.path.exists(manifest_path):
+        return None
+    
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        return {int(student_id): files for student_id, files in manifest["students"].items()}
+    except Exception as e:
+        print(f"⚠️ Warning: Could not read training manifest: {e}")
+        return None
+
+def save_manifest(students, manifest_path=MANIFEST_PATH):
+    """Save the record of which training images are in the model"""
+    manifest = {"students": {str(student_id): files for student_id, files in students.items()}}
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def update_training_status(students, engine, started_at):
+    """Record which images the model was trained on for the system status"""
+    try:
+        record_training(students, engine, started_at)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not update the status index: {e}")
+
+def write_lbph_model(path, recognizer, histograms, labels):
+    """Write LBPH histograms and labels in the format read by recognizer.read()"""
+    fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE)
+    fs.startWriteStruct(recognizer.getDefaultName(), cv2.FileNode_MAP)
+    fs.write("threshold", recognizer.getThreshold())
+    fs.write("radius", recognizer.getRadius())
+    fs.write("neighbors", recognizer.getNeighbors())
+    fs.write("grid_x", recognizer.getGridX())
+    fs.write("grid_y", recognizer.getGridY())
+    fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+    for histogram in histograms:
+        fs.write("", histogram)
+    fs.endWriteStruct()
+    fs.write("labels", np.asarray(labels, dtype=np.int32).reshape(-1, 1))
+    fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
+
+def remove_student_histograms(recognizer, student_ids):
+    """Return a recognizer without the histograms of the given students"""
+    histograms = recognizer.getHistograms()
+    labels = recognizer.getLabels()
+    labels = labels.ravel() if labels is not None else np.array([], dtype=np.int32)
+    
+    keep = [i for i, label in enumerate(labels) if int(label) not in student_ids]
+    if len(keep) == len(labels):
+        return recognizer
+    
+    # LBPH has no setter for its histograms, so round-trip the kept ones
+    # through a temporary model file
+    fd, tmp_path = tempfile.mkstemp(suffix=".yml")
+    os.close(fd)
+    try:
+        write_lbph_model(tmp_path, recognizer, [histograms[i] for i in keep], labels[keep])
+        trimmed = cv2.face.LBPHFaceRecognizer_create()
+        trimmed.read(tmp_path)
+    finally:
+        os.remove(tmp_path)
+    
+    return trimmed
+
+def find_changed_students(trained, current):
+    """Return students whose training images differ from what the model was trained on"""
+    return {
+        student_id for student_id in set(trained) | set(current)
+        if trained.get(student_id) != current.get(student_id)
+    }
+
+def train_full(recognizer, cache, students, training_path):
+    """Train the recognizer from every image in the training directory"""
+    if not students:
+        print("❌ Error: No training images found")
+        return False
+    
+    print(f"📁 Found {sum(len(files) for files in students.values())} training images")
+    cache.sync(training_path, students)
+    
+    print("🎯 Training model... This may take a few moments")
+    count, student_ids = stream_train(recognizer, cache.iter_chunks(cache.rows_for()))
+    
+    if not count:
+        print("❌ Error: No valid training data found")
+        return False
+    
+    print(f"📊 Trained on {count} images from {len(student_ids)} different people")
+    return True
+
+def train_incremental(recognizer, cache, trained, students, training_path):
+    """Update the recognizer with only the students whose images changed"""
+    changed = find_changed_students(trained, students)
+    if not changed:
+        print("✅ Model is already up to date")
+        return None
+    
+    # Drop stale histograms of changed or deleted students, then re-add
+    # every current image of the changed students
+    recognizer = remove_student_histograms(recognizer, changed & set(trained))
+    
+    cache.sync(training_path, students)
+    rows = cache.rows_for(changed & set(students))
+    
+    print(f"📁 Updating {len(changed)} changed students ({len(rows)} images)")
+    print("🎯 Updating model...")
+    count, student_ids = stream_train(recognizer, cache.iter_chunks(rows), update=True)
+    
+    labels = recognizer.getLabels()
+    if labels is None or not len(labels):
+        print("❌ Error: No training images left; the model was not changed")
+        return None
+    
+    print(f"📊 Updated {len(student_ids)} students with {count} images")
+    return recognizer
+
+def train_embeddings(training_path=TRAINING_PATH):
+    """Build the embedding model from every image in the training directory
+    
+    Each student is stored as the mean SFace embedding of their images, so
+    the model is small and is always rebuilt in full.
+    """
+    if not os.path.exists(SFACE_MODEL_PATH):
+        print(f"❌ Error: {SFACE_MODEL_PATH} not found")
+        return
+    
+    started_at = time.time()
+    students = scan_training_images(training_path)
+    if not students:
+        print("❌ Error: No training images found")
+        return
+    
+    print(f"📁 Found {sum(len(files) for files in students.values())} training images")
+    cache = FaceCache()
+    cache.sync(training_path, students)
+    
+    print("🎯 Computing face embeddings... This may take a few moments")
+    count, student_count = train_embedding_model(cache.iter_chunks(cache.rows_for()))
+    if not count:
+        print("❌ Error: No valid training data found")
+        return
+    
+    update_training_status(students, "embedding", started_at)
+    print(f"📊 Embedded {count} images from {student_count} different people")
+    print(f"✅ Model training completed successfully!")
+    print(f"📁 Model saved as: {EMBEDDING_MODEL_PATH}")
+
+def train_model(incremental=False, engine="lbph"):
     """Train the face recognition model"""
     try:
         print("🤖 Starting model training...")
         
+        if engine == "embedding":
+            train_embeddings()
+            return
+        
         # Create recognizer
         recognizer = cv2.face.LBPHFaceRecognizer_create()
         
@@ -55,27 +254,99 @@ def train_model():
             return
         
         # Get training data
-        training_path = "TrainingImage"
-        faces, ids = get_images_and_labels(training_path)
+        started_at = time.time()
+        training_path = TRAINING_PATH
+        students = scan_training_images(training_path)
+        cache = FaceCache()
         
-        if not faces or not ids:
-            print("❌ Error: No valid training data found")
+        trained = load_manifest() if incremental else None
+        if trained is not None and os.path.exists(MODEL_PATH):
+            print("⚡ Incremental training: only new or changed students will be processed")
+            recognizer.read(MODEL_PATH)
+            recognizer = train_incremental(recognizer, cache, trained, students, training_path)
+            if recognizer is None:
+                return
+        elif not train_full(recognizer, cache, students, training_path):
             return
         
-        # Train the model
-        print("🎯 Training model... This may take a few moments")
-        recognizer.train(faces, np.array(ids))
-        
         # Save the trained model
-        model_path = "trainer.yml"
-        recognizer.save(model_path)
+        model_path = MODEL_PATH
+        save_recognizer(recognizer, model_path)
+        save_fast_model(recognizer, FAST_MODEL_PATH)
+        save_manifest(students)
+        update_training_status(students, "lbph", started_at)
         
         print(f"✅ Model training completed successfully!")
-        print(f"📁 Model saved as: {model_path}")
-        print(f"📊 Trained on {len(faces)} images from {len(set(ids))} different people")
+        print(f"📁 Model saved as: {model_path} (fast format: {FAST_MODEL_PATH})")
         
     except Exception as e:
         print(f"❌ Error during training: {e}")
 
+def remove_model_files():
+    """Delete the trained LBPH model, its fast format and its manifest"""
+    for path in (MODEL_PATH, MANIFEST_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.isdir(FAST_MODEL_PATH):
+        shutil.rmtree(FAST_MODEL_PATH)
+
+def quarantine_images(student_id, training_path=TRAINING_PATH, removed_path=REMOVED_PATH):
+    """Move a student's training images to RemovedImages/<id> so no later training picks them up
+    
+    Returns the number of images moved.
+    """
+    students = scan_training_images(training_path)
+    files = students.get(student_id, {})
+    if not files:
+        return 0
+    
+    target = os.path.join(removed_path, str(student_id))
+    os.makedirs(target, exist_ok=True)
+    for filename in files:
+        shutil.move(os.path.join(training_path, filename), os.path.join(target, filename))
+    return len(files)
+
+def remove_student(student_id):
+    """Remove a student from the trained model and move their images out of TrainingImage"""
+    try:
+        if not os.path.exists(MODEL_PATH):
+            print("❌ Error: trainer.yml not found. Please train the model first.")
+            return
+        
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(MODEL_PATH)
+        recognizer = remove_student_histograms(recognizer, {student_id})
+        labels = recognizer.getLabels()
+        if labels is None or not len(labels):
+            # An empty LBPH model cannot be used; recognition asks for training instead
+            remove_model_files()
+        else:
+            save_recognizer(recognizer, MODEL_PATH)
+            save_fast_model(recognizer, FAST_MODEL_PATH)
+        
+        trained = load_manifest()
+        if trained is not None:
+            trained.pop(student_id, None)
+            save_manifest(trained)
+        moved = quarantine_images(student_id)
+        record_removal(student_id)
+        
+        print(f"🗑️ Removed student {student_id} from the model")
+        if moved:
+            print(f"📦 Moved {moved} training images to {os.path.join(REMOVED_PATH, str(student_id))}")
+        
+    except Exception as e:
+        print(f"❌ Error removing student: {e}")
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the face recognition model")
+    parser.add_argument("--full", action="store_true", help="retrain from every training image")
+    parser.add_argument("--remove", type=int, metavar="ID", help="remove a student from the model")
+    parser.add_argument("--engine", choices=["lbph", "embedding"], default="lbph",
+                        help="recognizer to train (default: lbph)")
+    args = parser.parse_args()
+    
+    if args.remove is not None:
+        remove_student(args.remove)
+    else:
+        train_model(incremental=not args.full, engine=args.engine)